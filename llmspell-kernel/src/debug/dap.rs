@@ -476,6 +476,35 @@ impl DAPBridge {
                     }
                 })
             }
+            // Non-standard: stackTrace, scopes and the first scope's variables
+            // in one round trip, for clients that inspect every stop
+            "llmspellInspect" => {
+                let args = request.get("arguments");
+                let thread_id = args
+                    .and_then(|a| a.get("threadId"))
+                    .and_then(serde_json::Value::as_i64)
+                    .unwrap_or(1) as i32;
+                let frame_id = args
+                    .and_then(|a| a.get("frameId"))
+                    .and_then(serde_json::Value::as_i64)
+                    .unwrap_or(0) as i32;
+                let frames = self.handle_stack_trace(thread_id)?;
+                let scopes = self.handle_scopes(frame_id)?;
+                let variables = match scopes.first() {
+                    Some(scope) => self.handle_variables(scope.variables_reference)?,
+                    None => Vec::new(),
+                };
+                serde_json::json!({
+                    "type": "response",
+                    "command": "llmspellInspect",
+                    "success": true,
+                    "body": {
+                        "stackFrames": frames,
+                        "scopes": scopes,
+                        "variables": variables
+                    }
+                })
+            }
             "continue" => {
                 self.handle_continue()?;
                 serde_json::json!({
@@ -1353,4 +1382,26 @@ mod tests {
         assert_eq!(seq2, 2);
         assert_eq!(seq3, 3);
     }
+
+    #[test]
+    fn test_inspect_request() {
+        let mut bridge = DAPBridge::new("test-session".to_string());
+        let manager = Arc::new(ExecutionManager::new("test-session".to_string()));
+        manager.push_frame("main".to_string(), "test.lua".to_string(), 4, None);
+        manager.add_variable("local", "x", "10", "number");
+        bridge.connect_execution_manager(manager);
+
+        let response = bridge
+            .handle_request(&serde_json::json!({
+                "command": "llmspellInspect",
+                "arguments": { "threadId": 1, "frameId": 0 }
+            }))
+            .unwrap();
+
+        assert_eq!(response["success"], true);
+        let body = &response["body"];
+        assert_eq!(body["stackFrames"].as_array().unwrap().len(), 1);
+        assert_eq!(body["scopes"][0]["name"], "Locals");
+        assert_eq!(body["variables"][0]["name"], "x");
+    }
 }
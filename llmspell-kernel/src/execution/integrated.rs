@@ -1493,10 +1493,10 @@ impl<P: Protocol + 'static> IntegratedKernel<P> {
 
         // Send event through IOPub channel via transport using multipart format
         if self.transport.is_some() {
-            // IOPub messages don't need client identity routing (broadcast channel)
-            let client_identity = b"".to_vec(); // Empty identity for IOPub
-            let multipart_event =
-                self.create_multipart_response(&client_identity, "debug_event", &event)?;
+            // IOPub messages don't need client identity routing (broadcast channel);
+            // the first frame is the PUB topic, so subscribers can filter on it
+            let topic = b"debug_event".to_vec();
+            let multipart_event = self.create_multipart_response(&topic, "debug_event", &event)?;
 
             if let Some(ref mut transport) = self.transport {
                 match transport.send("iopub", multipart_event).await {
@@ -11,6 +11,8 @@ use sha2::Sha256;
 use std::collections::HashMap;
 use uuid::Uuid;
 
+type HmacSha256 = Hmac<Sha256>;
+
 /// Jupyter wire protocol implementation (version 5.3)
 ///
 /// This protocol is used for ALL kernel communication, regardless of transport.
@@ -23,6 +25,8 @@ pub struct JupyterProtocol {
     username: String,
     /// HMAC key for message authentication (hex-encoded)
     hmac_key: Option<Vec<u8>>,
+    /// HMAC state already keyed with `hmac_key`, cloned for each signature
+    keyed_mac: Option<HmacSha256>,
 }
 
 impl JupyterProtocol {
@@ -34,6 +38,7 @@ impl JupyterProtocol {
             protocol_version: "5.3".to_string(),
             username: "kernel".to_string(),
             hmac_key: None,
+            keyed_mac: None,
         }
     }
 
@@ -45,6 +50,7 @@ impl JupyterProtocol {
             protocol_version: "5.3".to_string(),
             username: "client".to_string(),
             hmac_key: None,
+            keyed_mac: None,
         }
     }
 
@@ -53,6 +59,8 @@ impl JupyterProtocol {
         // jupyter_client expects the raw UTF-8 key, not hex-decoded
         // This matches the reference implementation behavior
         self.hmac_key = Some(key.as_bytes().to_vec());
+        // Key the HMAC once; HMAC accepts keys of any length
+        self.keyed_mac = HmacSha256::new_from_slice(key.as_bytes()).ok();
     }
 
     /// Sign message components according to Jupyter protocol
@@ -64,10 +72,9 @@ impl JupyterProtocol {
         metadata: &[u8],
         content: &[u8],
     ) -> Result<String> {
-        if let Some(ref key) = self.hmac_key {
-            type HmacSha256 = Hmac<Sha256>;
-            let mut mac =
-                HmacSha256::new_from_slice(key).map_err(|e| anyhow!("Invalid HMAC key: {e}"))?;
+        if let Some(ref keyed_mac) = self.keyed_mac {
+            // Cloning the keyed state skips the key schedule on every message
+            let mut mac = keyed_mac.clone();
 
             // Sign in the order specified by Jupyter protocol
             mac.update(header);
@@ -377,10 +384,9 @@ impl Protocol for JupyterProtocol {
         content: &[u8],
     ) -> Result<String> {
         // Use the existing internal sign_message implementation
-        if let Some(ref key) = self.hmac_key {
-            type HmacSha256 = Hmac<Sha256>;
-            let mut mac =
-                HmacSha256::new_from_slice(key).map_err(|e| anyhow!("Invalid HMAC key: {e}"))?;
+        if let Some(ref keyed_mac) = self.keyed_mac {
+            // Cloning the keyed state skips the key schedule on every message
+            let mut mac = keyed_mac.clone();
 
             // Sign in the order specified by Jupyter protocol
             mac.update(header);
@@ -400,6 +406,8 @@ impl Protocol for JupyterProtocol {
         // jupyter_client expects the raw UTF-8 key, not hex-decoded
         // This matches the reference implementation behavior
         self.hmac_key = Some(key.as_bytes().to_vec());
+        // Key the HMAC once; HMAC accepts keys of any length
+        self.keyed_mac = HmacSha256::new_from_slice(key.as_bytes()).ok();
     }
 }
 
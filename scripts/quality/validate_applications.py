@@ -11,12 +11,112 @@ import json
 import time
 import re
 import shutil
+import signal
 import argparse
+import atexit
+import contextlib
+import tempfile
+import threading
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict
 
+try:
+    import orjson  # Optional: faster report serialization
+except ImportError:
+    orjson = None
+
+# Maximum number of output lines kept per stream while an application runs
+OUTPUT_BUFFER_LINES = 10000
+
+# Output locations hard-coded by the example applications, removed before each run
+TEMP_DIRS = (
+    "/tmp/messy_files",
+    "/tmp/organized_files",
+    "/tmp/research_results",
+    "/tmp/generated_webapp"
+)
+TEMP_FILES = (
+    # file-organizer
+    "/tmp/organization-plan.txt",
+    # content-creator
+    "/tmp/content-topic.txt",
+    "/tmp/content-plan.md",
+    "/tmp/draft-content.md",
+    "/tmp/final-content.md",
+    "/tmp/quality-report.json",
+    # personal-assistant
+    "/tmp/personal-tasks.json",
+    "/tmp/personal-schedule.md",
+    "/tmp/personal-notes.txt",
+    "/tmp/assistant-report.md",
+    # communication-manager
+    "/tmp/communication-queue.json",
+    "/tmp/client-threads.json",
+    "/tmp/schedule-calendar.json",
+    "/tmp/tracking-dashboard.json",
+    "/tmp/communication-log.txt",
+    # code-review-assistant
+    "/tmp/code-review-report.md",
+    "/tmp/code-analysis.json",
+    "/tmp/review-comments.txt",
+    "/tmp/suggested-improvements.md",
+    # process-orchestrator
+    "/tmp/process-workflow.json",
+    "/tmp/orchestration-state.json",
+    "/tmp/workflow-log.txt",
+    "/tmp/process-report.md",
+    # knowledge-base
+    "/tmp/knowledge-store.json",
+    "/tmp/knowledge-index.db",
+    "/tmp/knowledge-graph.json",
+    "/tmp/knowledge-report.md",
+    # research-collector
+    "/tmp/research-summary.md",
+    "/tmp/research-raw-data.json",
+    "/tmp/research-insights.txt"
+)
+
+
+def _json_line(data: dict) -> str:
+    """Serialize one record as a single line of JSON"""
+    if orjson is not None:
+        return orjson.dumps(data).decode() + "\n"
+    return json.dumps(data) + "\n"
+
+
+@lru_cache(maxsize=128)
+def _binary_exists(path: str) -> bool:
+    """Whether a binary exists; cached since it won't disappear mid-run"""
+    return os.path.exists(path)
+
+
+def _existing_paths(paths) -> List[str]:
+    """Filter paths to those that exist, listing each parent directory once"""
+    listings: Dict[str, set] = {}
+    existing = []
+    for path in paths:
+        dir_name, base_name = os.path.split(path)
+        if dir_name not in listings:
+            try:
+                with os.scandir(dir_name) as entries:
+                    listings[dir_name] = {entry.name for entry in entries}
+            except FileNotFoundError:
+                listings[dir_name] = set()
+        if base_name in listings[dir_name]:
+            existing.append(path)
+    return existing
+
+
+def _drain_stream(stream, buffer: deque):
+    """Read a child process stream line by line into a bounded buffer"""
+    for line in iter(stream.readline, ''):
+        buffer.append(line)
+    stream.close()
+
 
 @dataclass
 class TestResult:
@@ -45,6 +145,8 @@ class TestReport:
 
     def to_json(self) -> str:
         """Convert report to JSON"""
+        if orjson is not None:
+            return orjson.dumps(asdict(self), option=orjson.OPT_INDENT_2).decode()
         return json.dumps(asdict(self), indent=2)
 
     def to_html(self) -> str:
@@ -121,6 +223,10 @@ class ApplicationValidator:
         self.verbose = verbose
         self.results: List[TestResult] = []
 
+        # Scratch space for outputs whose location the validator controls
+        self.run_root = Path(tempfile.mkdtemp(prefix="llmspell-validate-"))
+        atexit.register(shutil.rmtree, self.run_root, ignore_errors=True)
+
         # Application metadata with realistic timeouts for API calls
         self.applications = {
             # Layer 1: Universal (2-3 agents) - simple API calls
@@ -131,74 +237,116 @@ class ApplicationValidator:
             "content-creator": {"layer": 2, "agents": 4, "runtime": 90, "config": "content-creator/config.toml"},
 
             # Layer 3: Business (5-7 agents) - higher complexity
-            "personal-assistant": {"layer": 3, "agents": 5, "runtime": 120, "config": "personal-assistant/config.toml"},
-            "communication-manager": {"layer": 3, "agents": 5, "runtime": 120, "config": "communication-manager/config.toml"},
-            "code-review-assistant": {"layer": 3, "agents": 7, "runtime": 150, "config": "code-review-assistant/config.toml"},
+            "personal-assistant": {
+                "layer": 3, "agents": 5, "runtime": 120, "config": "personal-assistant/config.toml",
+                "artifact": "assistant",
+                "success_markers": (
+                    "Personal Assistant Complete!",
+                    "Assistant Complete!",
+                    "Status: COMPLETED",
+                    "Assistant Status: ACTIVE",
+                    "Personal Assistant v1.0 Ready!",
+                    "Layer Business Personal Assistant Complete!",
+                ),
+                "expected_files": (
+                    "/tmp/personal-tasks.json",
+                    "/tmp/personal-schedule.md",
+                    "/tmp/personal-notes.txt",
+                    "/tmp/assistant-report.md",
+                ),
+            },
+            "communication-manager": {
+                "layer": 3, "agents": 5, "runtime": 120, "config": "communication-manager/config.toml",
+                "artifact": "communication",
+                "success_markers": (
+                    "Communication Manager Complete!",
+                    "Status: COMPLETED",
+                    "Layer Business Communication Manager Complete!",
+                ),
+                "expected_files": (
+                    "/tmp/communication-queue.json",
+                    "/tmp/client-threads.json",
+                    "/tmp/schedule-calendar.json",
+                    "/tmp/tracking-dashboard.json",
+                    "/tmp/communication-log.txt",
+                ),
+            },
+            "code-review-assistant": {
+                "layer": 3, "agents": 7, "runtime": 150, "config": "code-review-assistant/config.toml",
+                "artifact": "review",
+                "success_markers": (
+                    "Code Review Complete!",
+                    "Review Complete!",
+                    "Status: COMPLETED",
+                    "Layer Professional Code Review Assistant Complete!",
+                ),
+                "expected_files": (
+                    "/tmp/code-review-report.md",
+                    "/tmp/code-analysis.json",
+                    "/tmp/review-comments.txt",
+                    "/tmp/suggested-improvements.md",
+                ),
+            },
 
             # Layer 4: Professional (8 agents) - complex workflows
-            "process-orchestrator": {"layer": 4, "agents": 8, "runtime": 180, "config": "process-orchestrator/config.toml"},
-            "knowledge-base": {"layer": 4, "agents": 8, "runtime": 180, "config": "knowledge-base/config.toml"},
+            "process-orchestrator": {
+                "layer": 4, "agents": 8, "runtime": 180, "config": "process-orchestrator/config.toml",
+                "artifact": "process",
+                "success_markers": (
+                    "Process Orchestrator Complete!",
+                    "Orchestrator Complete!",
+                    "Status: COMPLETED",
+                    "Layer Professional Process Orchestrator Complete!",
+                ),
+                "expected_files": (
+                    "/tmp/process-workflow.json",
+                    "/tmp/orchestration-state.json",
+                    "/tmp/workflow-log.txt",
+                    "/tmp/process-report.md",
+                ),
+            },
+            "knowledge-base": {
+                "layer": 4, "agents": 8, "runtime": 180, "config": "knowledge-base/config.toml",
+                "artifact": "knowledge",
+                "success_markers": (
+                    "Knowledge Base Complete!",
+                    "Knowledge Base v1.0 Setup Complete!",
+                    "System Status: OPERATIONAL",
+                    "Status: COMPLETED",
+                    "Layer Expert Knowledge Base Complete!",
+                ),
+                "expected_files": (
+                    "/tmp/knowledge-store.json",
+                    "/tmp/knowledge-index.db",
+                    "/tmp/knowledge-graph.json",
+                    "/tmp/knowledge-report.md",
+                ),
+            },
 
             # Layer 5: Expert (21 agents) - very complex
             "webapp-creator": {"layer": 5, "agents": 21, "runtime": 600, "config": "config.toml"},
         }
 
+        # One compiled alternation per table-driven app so stdout is scanned once,
+        # including the generic "Layer ... Complete!" fallback
+        self._markers = {
+            app_name: re.compile(
+                "|".join(re.escape(m) for m in info["success_markers"]) +
+                r"|\A(?=.*Layer)(?=.*Complete!)",
+                re.DOTALL
+            )
+            for app_name, info in self.applications.items()
+            if "success_markers" in info
+        }
+
     def _cleanup_temp_files(self):
         """Clean up temporary test files"""
-        temp_dirs = [
-            "/tmp/messy_files",
-            "/tmp/organized_files",
-            "/tmp/research_results",
-            "/tmp/generated_webapp"
-        ]
-        temp_files = [
-            # file-organizer
-            "/tmp/organization-plan.txt",
-            # content-creator
-            "/tmp/content-topic.txt",
-            "/tmp/content-plan.md",
-            "/tmp/draft-content.md",
-            "/tmp/final-content.md",
-            "/tmp/quality-report.json",
-            # personal-assistant
-            "/tmp/personal-tasks.json",
-            "/tmp/personal-schedule.md",
-            "/tmp/personal-notes.txt",
-            "/tmp/assistant-report.md",
-            # communication-manager
-            "/tmp/communication-queue.json",
-            "/tmp/client-threads.json",
-            "/tmp/schedule-calendar.json",
-            "/tmp/tracking-dashboard.json",
-            "/tmp/communication-log.txt",
-            # code-review-assistant
-            "/tmp/code-review-report.md",
-            "/tmp/code-analysis.json",
-            "/tmp/review-comments.txt",
-            "/tmp/suggested-improvements.md",
-            # process-orchestrator
-            "/tmp/process-workflow.json",
-            "/tmp/orchestration-state.json",
-            "/tmp/workflow-log.txt",
-            "/tmp/process-report.md",
-            # knowledge-base
-            "/tmp/knowledge-store.json",
-            "/tmp/knowledge-index.db",
-            "/tmp/knowledge-graph.json",
-            "/tmp/knowledge-report.md",
-            # research-collector
-            "/tmp/research-summary.md",
-            "/tmp/research-raw-data.json",
-            "/tmp/research-insights.txt"
-        ]
+        # Remove directly instead of checking existence first
+        for dir_path in TEMP_DIRS:
+            shutil.rmtree(dir_path, ignore_errors=True)
 
-        for dir_path in temp_dirs:
-            if os.path.exists(dir_path):
-                shutil.rmtree(dir_path, ignore_errors=True)
-
-        for file_path in temp_files:
-            if os.path.exists(file_path):
-                os.remove(file_path)
+        for file_path in TEMP_FILES:
+            Path(file_path).unlink(missing_ok=True)
 
     def run_application(self, app_name: str, config: Optional[str] = None,
                        args: List[str] = None, timeout: int = 300) -> Tuple[subprocess.CompletedProcess, float]:
@@ -223,19 +371,45 @@ class ApplicationValidator:
         if self.verbose:
             print(f"\nExecuting: {' '.join(cmd)}")
 
-        # Run with timeout and capture output
-        start_time = time.time()
+        # Run with timeout, streaming output into bounded buffers so a chatty
+        # application can neither exhaust memory nor block on a full pipe
+        start_time = time.perf_counter()
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=16384,
+            close_fds=False,  # our fds are non-inheritable; skip the close-all walk
+            start_new_session=True  # own process group, so a timeout kills its children too
+        )
+        stdout_buf = deque(maxlen=OUTPUT_BUFFER_LINES)
+        stderr_buf = deque(maxlen=OUTPUT_BUFFER_LINES)
+        readers = [
+            threading.Thread(target=_drain_stream, args=(proc.stdout, stdout_buf), daemon=True),
+            threading.Thread(target=_drain_stream, args=(proc.stderr, stderr_buf), daemon=True)
+        ]
+        for reader in readers:
+            reader.start()
+
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-            runtime = time.time() - start_time
-            return result, runtime
+            returncode = proc.wait(timeout=timeout)
+            timed_out = False
         except subprocess.TimeoutExpired:
-            runtime = time.time() - start_time
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            proc.wait()
+            timed_out = True
+
+        # Output is discarded on timeout, so don't wait on any descendant that
+        # escaped the process group and still holds the pipes open
+        for reader in readers:
+            reader.join(timeout=1 if timed_out else None)
+        runtime = time.perf_counter() - start_time
+
+        if timed_out:
             # Create a fake result for timeout
             result = subprocess.CompletedProcess(
                 args=cmd,
@@ -243,7 +417,14 @@ class ApplicationValidator:
                 stdout="",
                 stderr=f"Process timed out after {timeout} seconds"
             )
-            return result, runtime
+        else:
+            result = subprocess.CompletedProcess(
+                args=cmd,
+                returncode=returncode,
+                stdout="".join(stdout_buf),
+                stderr="".join(stderr_buf)
+            )
+        return result, runtime
 
     def validate_application(self, app_name: str) -> TestResult:
         """Generic validation for any application"""
@@ -610,10 +791,9 @@ class ApplicationValidator:
         # Clean up before test
         self._cleanup_temp_files()
 
-        # Test with custom output directory using script arguments
-        custom_output = "/tmp/test-webapp-output"
-        if os.path.exists(custom_output):
-            shutil.rmtree(custom_output, ignore_errors=True)
+        # Test with custom output directory using script arguments; it lives in
+        # this run's scratch directory so it starts empty and is removed at exit
+        custom_output = str(self.run_root / "webapp-output")
 
         # Get config for this app
         app_info = self.applications[app_name]
@@ -698,279 +878,9 @@ class ApplicationValidator:
             files_created=files_created
         )
 
-    def validate_personal_assistant(self) -> TestResult:
-        """Validate personal-assistant application"""
-        app_name = "personal-assistant"
-        print(f"\n🔍 Testing {app_name}...")
-
-        # Clean up before test
-        self._cleanup_temp_files()
-
-        # Get config for this app
-        app_info = self.applications[app_name]
-        config_file = app_info['config']
-
-        # Run application with config
-        result, runtime = self.run_application(app_name, config=config_file, timeout=app_info['runtime'])
-
-        # Initialize test result
-        errors = []
-        validations = {}
-        files_created = []
-
-        # Check for successful execution
-        validations["script_executed"] = (
-            "Personal Assistant Complete!" in result.stdout or
-            "Assistant Complete!" in result.stdout or
-            "Status: COMPLETED" in result.stdout or
-            "Assistant Status: ACTIVE" in result.stdout or
-            "Personal Assistant v1.0 Ready!" in result.stdout or
-            "Layer Business Personal Assistant Complete!" in result.stdout or
-            ("Layer" in result.stdout and "Complete!" in result.stdout)
-        )
-
-        # Check for expected files
-        expected_files = [
-            "/tmp/personal-tasks.json",
-            "/tmp/personal-schedule.md",
-            "/tmp/personal-notes.txt",
-            "/tmp/assistant-report.md"
-        ]
-
-        for file_path in expected_files:
-            if os.path.exists(file_path):
-                files_created.append(file_path)
-
-        validations["files_created"] = len(files_created) > 0
-
-        # Status determination
-        if result.returncode != 0:
-            errors.append(f"Non-zero exit code: {result.returncode}")
-
-        if validations["script_executed"]:
-            status = "passed"
-            if not validations["files_created"]:
-                errors.append("No assistant files created - likely missing API keys")
-        else:
-            status = "failed"
-            errors.append("Script execution failed")
-
-        return TestResult(
-            app_name=app_name,
-            layer=self.applications[app_name]["layer"],
-            status=status,
-            runtime_seconds=runtime,
-            stdout=result.stdout[:1000] if self.verbose else "",
-            stderr=result.stderr[:500] if self.verbose else "",
-            errors=errors,
-            validations=validations,
-            files_created=files_created
-        )
-
-    def validate_communication_manager(self) -> TestResult:
-        """Validate communication-manager application"""
-        app_name = "communication-manager"
-        print(f"\n🔍 Testing {app_name}...")
-
-        # Clean up before test
-        self._cleanup_temp_files()
-
-        # Get config for this app
-        app_info = self.applications[app_name]
-        config_file = app_info['config']
-
-        # Run application with config
-        result, runtime = self.run_application(app_name, config=config_file, timeout=app_info['runtime'])
-
-        # Initialize test result
-        errors = []
-        validations = {}
-        files_created = []
-
-        # Check for successful execution
-        validations["script_executed"] = (
-            "Communication Manager Complete!" in result.stdout or
-            "Status: COMPLETED" in result.stdout or
-            "Layer Business Communication Manager Complete!" in result.stdout or
-            ("Layer" in result.stdout and "Complete!" in result.stdout)
-        )
-
-        # Check for expected files
-        expected_files = [
-            "/tmp/communication-queue.json",
-            "/tmp/client-threads.json",
-            "/tmp/schedule-calendar.json",
-            "/tmp/tracking-dashboard.json",
-            "/tmp/communication-log.txt"
-        ]
-
-        for file_path in expected_files:
-            if os.path.exists(file_path):
-                files_created.append(file_path)
-
-        validations["files_created"] = len(files_created) > 0
-
-        # Status determination
-        if result.returncode != 0:
-            errors.append(f"Non-zero exit code: {result.returncode}")
-
-        if validations["script_executed"]:
-            status = "passed"
-            if not validations["files_created"]:
-                errors.append("No communication files created - likely missing API keys")
-        else:
-            status = "failed"
-            errors.append("Script execution failed")
-
-        return TestResult(
-            app_name=app_name,
-            layer=self.applications[app_name]["layer"],
-            status=status,
-            runtime_seconds=runtime,
-            stdout=result.stdout[:1000] if self.verbose else "",
-            stderr=result.stderr[:500] if self.verbose else "",
-            errors=errors,
-            validations=validations,
-            files_created=files_created
-        )
-
-    def validate_code_review_assistant(self) -> TestResult:
-        """Validate code-review-assistant application"""
-        app_name = "code-review-assistant"
-        print(f"\n🔍 Testing {app_name}...")
-
-        # Clean up before test
-        self._cleanup_temp_files()
-
-        # Get config for this app
-        app_info = self.applications[app_name]
-        config_file = app_info['config']
-
-        # Run application with config
-        result, runtime = self.run_application(app_name, config=config_file, timeout=app_info['runtime'])
-
-        # Initialize test result
-        errors = []
-        validations = {}
-        files_created = []
-
-        # Check for successful execution
-        validations["script_executed"] = (
-            "Code Review Complete!" in result.stdout or
-            "Review Complete!" in result.stdout or
-            "Status: COMPLETED" in result.stdout or
-            "Layer Professional Code Review Assistant Complete!" in result.stdout or
-            ("Layer" in result.stdout and "Complete!" in result.stdout)
-        )
-
-        # Check for expected files (based on code review output)
-        expected_files = [
-            "/tmp/code-review-report.md",
-            "/tmp/code-analysis.json",
-            "/tmp/review-comments.txt",
-            "/tmp/suggested-improvements.md"
-        ]
-
-        for file_path in expected_files:
-            if os.path.exists(file_path):
-                files_created.append(file_path)
-
-        validations["files_created"] = len(files_created) > 0
-
-        # Status determination
-        if result.returncode != 0:
-            errors.append(f"Non-zero exit code: {result.returncode}")
-
-        if validations["script_executed"]:
-            status = "passed"
-            if not validations["files_created"]:
-                errors.append("No review files created - likely missing API keys")
-        else:
-            status = "failed"
-            errors.append("Script execution failed")
-
-        return TestResult(
-            app_name=app_name,
-            layer=self.applications[app_name]["layer"],
-            status=status,
-            runtime_seconds=runtime,
-            stdout=result.stdout[:1000] if self.verbose else "",
-            stderr=result.stderr[:500] if self.verbose else "",
-            errors=errors,
-            validations=validations,
-            files_created=files_created
-        )
-
-    def validate_process_orchestrator(self) -> TestResult:
-        """Validate process-orchestrator application"""
-        app_name = "process-orchestrator"
-        print(f"\n🔍 Testing {app_name}...")
-
-        # Clean up before test
-        self._cleanup_temp_files()
-
-        # Get config for this app
-        app_info = self.applications[app_name]
-        config_file = app_info['config']
-
-        # Run application with config
-        result, runtime = self.run_application(app_name, config=config_file, timeout=app_info['runtime'])
-
-        # Initialize test result
-        errors = []
-        validations = {}
-        files_created = []
-
-        # Check for successful execution
-        validations["script_executed"] = (
-            "Process Orchestrator Complete!" in result.stdout or
-            "Orchestrator Complete!" in result.stdout or
-            "Status: COMPLETED" in result.stdout or
-            "Layer Professional Process Orchestrator Complete!" in result.stdout or
-            ("Layer" in result.stdout and "Complete!" in result.stdout)
-        )
-
-        # Check for expected files
-        expected_files = [
-            "/tmp/process-workflow.json",
-            "/tmp/orchestration-state.json",
-            "/tmp/workflow-log.txt",
-            "/tmp/process-report.md"
-        ]
-
-        for file_path in expected_files:
-            if os.path.exists(file_path):
-                files_created.append(file_path)
-
-        validations["files_created"] = len(files_created) > 0
-
-        # Status determination
-        if result.returncode != 0:
-            errors.append(f"Non-zero exit code: {result.returncode}")
-
-        if validations["script_executed"]:
-            status = "passed"
-            if not validations["files_created"]:
-                errors.append("No process files created - likely missing API keys")
-        else:
-            status = "failed"
-            errors.append("Script execution failed")
-
-        return TestResult(
-            app_name=app_name,
-            layer=self.applications[app_name]["layer"],
-            status=status,
-            runtime_seconds=runtime,
-            stdout=result.stdout[:1000] if self.verbose else "",
-            stderr=result.stderr[:500] if self.verbose else "",
-            errors=errors,
-            validations=validations,
-            files_created=files_created
-        )
-
-    def validate_knowledge_base(self) -> TestResult:
-        """Validate knowledge-base application"""
-        app_name = "knowledge-base"
+    def _run_and_validate(self, app_name: str, success_pattern: re.Pattern,
+                          expected_files: Tuple[str, ...]) -> TestResult:
+        """Validate an application whose checks are fully described by its metadata"""
         print(f"\n🔍 Testing {app_name}...")
 
         # Clean up before test
@@ -982,6 +892,7 @@ class ApplicationValidator:
 
         # Run application with config
         result, runtime = self.run_application(app_name, config=config_file, timeout=app_info['runtime'])
+        stdout = result.stdout
 
         # Initialize test result
         errors = []
@@ -989,26 +900,10 @@ class ApplicationValidator:
         files_created = []
 
         # Check for successful execution
-        validations["script_executed"] = (
-            "Knowledge Base Complete!" in result.stdout or
-            "Knowledge Base v1.0 Setup Complete!" in result.stdout or
-            "System Status: OPERATIONAL" in result.stdout or
-            "Status: COMPLETED" in result.stdout or
-            "Layer Expert Knowledge Base Complete!" in result.stdout or
-            ("Layer" in result.stdout and "Complete!" in result.stdout)
-        )
+        validations["script_executed"] = success_pattern.search(stdout) is not None
 
         # Check for expected files
-        expected_files = [
-            "/tmp/knowledge-store.json",
-            "/tmp/knowledge-index.db",
-            "/tmp/knowledge-graph.json",
-            "/tmp/knowledge-report.md"
-        ]
-
-        for file_path in expected_files:
-            if os.path.exists(file_path):
-                files_created.append(file_path)
+        files_created.extend(_existing_paths(expected_files))
 
         validations["files_created"] = len(files_created) > 0
 
@@ -1019,69 +914,72 @@ class ApplicationValidator:
         if validations["script_executed"]:
             status = "passed"
             if not validations["files_created"]:
-                errors.append("No knowledge files created - likely missing API keys")
+                errors.append(f"No {app_info['artifact']} files created - likely missing API keys")
         else:
             status = "failed"
             errors.append("Script execution failed")
 
         return TestResult(
             app_name=app_name,
-            layer=self.applications[app_name]["layer"],
+            layer=app_info["layer"],
             status=status,
             runtime_seconds=runtime,
-            stdout=result.stdout[:1000] if self.verbose else "",
+            stdout=stdout[:1000] if self.verbose else "",
             stderr=result.stderr[:500] if self.verbose else "",
             errors=errors,
             validations=validations,
             files_created=files_created
         )
 
-    def run_all_tests(self, layer_filter: Optional[int] = None) -> TestReport:
-        """Run all application tests"""
+    def run_all_tests(self, layer_filter: Optional[int] = None,
+                      progress_file: Optional[str] = None) -> TestReport:
+        """Run all application tests, streaming each result to progress_file if given"""
         print("=" * 60)
         print("llmspell Application Validation Suite")
         print("=" * 60)
 
         # Check llmspell binary exists
-        if not os.path.exists(self.llmspell_bin):
+        if not _binary_exists(self.llmspell_bin):
             print(f"❌ Error: llmspell binary not found at {self.llmspell_bin}")
             print("  Please build with: cargo build")
             sys.exit(1)
 
         print(f"✓ Using llmspell binary: {self.llmspell_bin}")
 
-        start_time = time.time()
+        start_time = time.perf_counter()
         self.results = []
 
-        # Define validation methods for each app
+        # Apps with bespoke checks; table-driven apps go through _run_and_validate
         validators = {
             "file-organizer": self.validate_file_organizer,
             "research-collector": self.validate_research_collector,
             "content-creator": self.validate_content_creator,
-            "personal-assistant": self.validate_personal_assistant,
-            "communication-manager": self.validate_communication_manager,
-            "code-review-assistant": self.validate_code_review_assistant,
-            "process-orchestrator": self.validate_process_orchestrator,
-            "knowledge-base": self.validate_knowledge_base,
             "webapp-creator": self.validate_webapp_creator
         }
 
-        # Run tests
-        for app_name, metadata in self.applications.items():
-            # Skip if layer filter doesn't match
-            if layer_filter and metadata["layer"] != layer_filter:
-                continue
-
-            # Run validator (use generic if no specific one exists)
-            try:
-                if app_name in validators:
-                    result = validators[app_name]()
-                else:
-                    result = self.validate_application(app_name)
-                self.results.append(result)
-            except Exception as e:
-                print(f"❌ Error testing {app_name}: {e}")
-                self.results.append(TestResult(
+        # The progress file is closed however the loop ends, including on
+        # KeyboardInterrupt or a validator calling sys.exit()
+        with (open(progress_file, "w", encoding="utf-8") if progress_file
+              else contextlib.nullcontext()) as progress:
+            # Run tests
+            for app_name, metadata in self.applications.items():
+                # Skip if layer filter doesn't match
+                if layer_filter and metadata["layer"] != layer_filter:
+                    continue
+
+                # Run validator (use generic if no specific one exists)
+                try:
+                    if app_name in validators:
+                        result = validators[app_name]()
+                    elif "success_markers" in metadata:
+                        result = self._run_and_validate(
+                            app_name, self._markers[app_name], metadata["expected_files"]
+                        )
+                    else:
+                        result = self.validate_application(app_name)
+                except Exception as e:
+                    print(f"❌ Error testing {app_name}: {e}")
+                    result = TestResult(
                         app_name=app_name,
                         layer=metadata["layer"],
                         status="failed",
@@ -1091,10 +989,16 @@ class ApplicationValidator:
                         errors=[f"Test exception: {e}"],
                         validations={},
                         files_created=[]
-                    ))
+                    )
+                self.results.append(result)
+
+                # Persist each result as it completes so a crash keeps partial results
+                if progress:
+                    progress.write(_json_line(asdict(result)))
+                    progress.flush()
 
         # Generate report
-        total_runtime = time.time() - start_time
+        total_runtime = time.perf_counter() - start_time
 
         report = TestReport(
             timestamp=datetime.now().isoformat(),
@@ -1146,22 +1050,30 @@ def main():
         verbose=args.verbose
     )
 
+    # Results are streamed to a JSONL progress file while the suite runs, so
+    # they survive a crash; it is removed once the full report is written
+    report_stem = f"test_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    progress_file = f"{report_stem}.jsonl" if args.report else None
+
     # Run tests
-    report = validator.run_all_tests(layer_filter=args.layer)
+    report = validator.run_all_tests(layer_filter=args.layer, progress_file=progress_file)
 
     # Save report if requested
     if args.report == "json":
-        report_file = f"test_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(report_file, "w") as f:
+        report_file = f"{report_stem}.json"
+        with open(report_file, "w", encoding="utf-8") as f:
             f.write(report.to_json())
         print(f"\n📊 JSON report saved to: {report_file}")
 
     elif args.report == "html":
-        report_file = f"test_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+        report_file = f"{report_stem}.html"
         with open(report_file, "w") as f:
             f.write(report.to_html())
         print(f"\n📊 HTML report saved to: {report_file}")
 
+    if progress_file:
+        os.remove(progress_file)
+
     # Exit with appropriate code
     if report.failed > 0:
         sys.exit(1)
@@ -0,0 +1,112 @@
+"""
+Instrumentation for looking inside jupyter_client's control channel.
+
+Used by the diagnostic variants in test_control_channel.py to see exactly
+what a channel sends and how Session.send() is reached.
+"""
+
+import inspect
+import os
+from contextlib import contextmanager
+from jupyter_client.channels import ZMQSocketChannel
+
+# Per-call tracing output of traced_session(); opt-in since it is verbose
+TRACE_ENABLED = os.environ.get("LLMSPELL_TRACE_SEND") == "1"
+
+class DebugZMQSocketChannel(ZMQSocketChannel):
+    """Custom channel that logs all send operations."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent_messages = []
+
+    def _send(self, msg):
+        """Override internal send to capture messages."""
+        print(f"\n🔍 DebugChannel._send() called")
+        print(f"   Message type: {type(msg)}")
+        print(f"   Message keys: {list(msg.keys()) if isinstance(msg, dict) else 'not a dict'}")
+
+        # Log the message
+        self.sent_messages.append(msg)
+
+        # Call the parent implementation
+        super()._send(msg)
+        print(f"   ✅ Parent _send() completed")
+
+    def _run_thread(self):
+        """Override thread runner to add logging."""
+        print("🔍 DebugChannel thread started")
+        super()._run_thread()
+
+@contextmanager
+def debug_channel(client):
+    """Temporarily turn a client's control channel into a DebugZMQSocketChannel."""
+    channel = client.control_channel
+    original_class = channel.__class__
+    channel.__class__ = DebugZMQSocketChannel
+    channel.sent_messages = []
+    try:
+        yield channel
+    finally:
+        channel.__class__ = original_class
+        del channel.sent_messages
+
+def traced_send(original_send, stream, msg_or_type, content=None, parent=None, **kwargs):
+    """Traced version of Session.send()"""
+    if not TRACE_ENABLED:
+        return original_send(stream, msg_or_type, content, parent, **kwargs)
+
+    print(f"\n🔍 Session.send() called:")
+    print(f"   stream: {stream}")
+    print(f"   stream type: {type(stream)}")
+    print(f"   msg_or_type: {msg_or_type if not isinstance(msg_or_type, dict) else 'dict'}")
+
+    if isinstance(msg_or_type, dict):
+        print(f"   msg keys: {list(msg_or_type.keys())}")
+        print(f"   msg_type: {msg_or_type.get('msg_type')}")
+
+    print(f"   content: {content}")
+    print(f"   parent: {parent}")
+
+    # Call original
+    result = original_send(stream, msg_or_type, content, parent, **kwargs)
+    print(f"   ✅ Session.send() completed, returned: {type(result)}")
+    return result
+
+@contextmanager
+def traced_session(client):
+    """Temporarily route a client's Session.send() through traced_send()."""
+    session = client.session
+    original_send = session.send
+    session.send = lambda *args, **kwargs: traced_send(original_send, *args, **kwargs)
+    try:
+        yield session
+    finally:
+        # Drop the instance attribute so the class method is visible again
+        del session.send
+
+def describe_channel(channel):
+    """Print the source of a channel's send() and its internal state."""
+    print("   Source of send():")
+    try:
+        source = inspect.getsource(channel.send)
+        for i, line in enumerate(source.split('\n')[:20], 1):
+            print(f"   {i:3}: {line}")
+    except Exception as e:
+        print(f"   Could not get source: {e}")
+
+    # Check for stream/queue-based sending
+    if hasattr(channel, 'stream'):
+        print(f"   stream exists: {channel.stream}")
+    if hasattr(channel, '_queue'):
+        print(f"   _queue exists: {channel._queue}")
+
+    # Try to access the thread's internal state
+    if hasattr(channel, '_thread'):
+        thread = channel._thread
+        print(f"   Thread alive: {thread.is_alive() if thread else 'No thread'}")
+
+    if hasattr(channel, 'socket'):
+        sock = channel.socket
+        print(f"   Socket state: {sock}")
+        print(f"   Socket type: {sock.socket_type if hasattr(sock, 'socket_type') else 'unknown'}")
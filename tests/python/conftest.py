@@ -0,0 +1,133 @@
+"""
+Shared pytest fixtures for the llmspell Jupyter protocol tests.
+
+The kernel daemon and its client are created once per test session and
+reused by every test that asks for them; leftover messages are drained
+between tests so each test starts from quiet channels.
+"""
+
+import os
+
+import pytest
+import zmq
+
+from kernel_helpers import (
+    find_llmspell, start_kernel, stop_kernel, shared_client, close_clients, drain_channels,
+    initialize_dap, reset_dap, iopub_subscription
+)
+
+
+def pytest_configure(config):
+    """Register markers and resolve the llmspell binary once.
+
+    The binary path is exported through LLMSPELL_BINARY for worker processes.
+    """
+    config.addinivalue_line(
+        "markers", "diagnostic: jupyter_client internals tracing, not a protocol check"
+    )
+    binary = find_llmspell()
+    if binary is not None:
+        os.environ["LLMSPELL_BINARY"] = str(binary)
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip diagnostic tests unless LLMSPELL_DIAGNOSTICS=1 is set.
+
+    They instrument jupyter_client internals and dump source; useful when
+    chasing a protocol problem, noise otherwise.
+    """
+    if os.environ.get("LLMSPELL_DIAGNOSTICS") == "1":
+        return
+    skip = pytest.mark.skip(reason="diagnostic; set LLMSPELL_DIAGNOSTICS=1 to run")
+    for item in items:
+        if "diagnostic" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Stop clients that tests took from shared_client() without a fixture."""
+    close_clients()
+
+
+@pytest.fixture(scope="session")
+def kernel_dir(tmp_path_factory):
+    """Directory for the kernel's connection, log and PID files.
+
+    tmp_path_factory is unique per pytest-xdist worker, so parallel workers
+    each run their own kernel without clobbering each other's files.
+    """
+    return tmp_path_factory.mktemp("llmspell")
+
+
+@pytest.fixture(scope="session")
+def kernel_connection_file(kernel_dir):
+    """Connection file of the session's kernel."""
+    return kernel_dir / "kernel.json"
+
+
+@pytest.fixture(scope="session")
+def llmspell_daemon(kernel_dir):
+    """Start one llmspell kernel daemon for the whole test session."""
+    conn_info = start_kernel(kernel_dir)
+    if not conn_info:
+        pytest.skip("Kernel not available")
+    yield conn_info
+    stop_kernel(kernel_dir)
+
+
+@pytest.fixture(scope="session")
+def zmq_context():
+    """ZMQ context shared by every kernel client in the session."""
+    context = zmq.Context.instance()
+    yield context
+    context.destroy(linger=1000)
+
+
+@pytest.fixture(scope="session")
+def kernel_client(llmspell_daemon, kernel_connection_file, zmq_context):
+    """Kernel client shared by all tests in the session."""
+    yield shared_client(kernel_connection_file, context=zmq_context)
+    close_clients()
+
+
+@pytest.fixture(scope="session")
+def test_script_dir(tmp_path_factory):
+    """Directory for Lua scripts the tests debug, shared across the session."""
+    return tmp_path_factory.mktemp("scripts")
+
+
+@pytest.fixture(scope="session")
+def dap_initialized(kernel_client):
+    """Reply to a DAP initialize sent once for the session's client.
+
+    Capability negotiation is per client, so tests that only need an
+    initialized debugger share this instead of each sending their own.
+    """
+    return initialize_dap(kernel_client)
+
+
+@pytest.fixture
+def dap_reset(kernel_client):
+    """Disconnect the debugger after a test that sets breakpoints or launches.
+
+    The kernel and client live for the whole session, so without this a
+    later test executing Lua would still run in debug mode and stop at the
+    breakpoints this one left behind.
+    """
+    yield
+    reset_dap(kernel_client)
+
+
+@pytest.fixture
+def debug_iopub(kernel_client):
+    """Narrow the shared client's iopub to debug events for one test."""
+    with iopub_subscription(kernel_client) as sock:
+        yield sock
+
+
+@pytest.fixture(autouse=True)
+def _drain_channels(request):
+    """Drain leftover messages from the shared client after each test."""
+    yield
+    if "kernel_client" in request.fixturenames:
+        drain_channels(request.getfixturevalue("kernel_client"))
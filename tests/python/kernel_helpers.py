@@ -0,0 +1,542 @@
+"""
+Kernel lifecycle helpers shared by the llmspell Jupyter protocol tests.
+
+Used both by the pytest fixtures in conftest.py and by the test scripts
+when they are run directly.
+"""
+
+import hashlib
+import hmac
+import json
+import subprocess
+import time
+import uuid
+import os
+import select
+import signal
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
+from queue import Empty
+from pathlib import Path
+import zmq
+from jupyter_client import BlockingKernelClient, protocol_version
+
+try:
+    import orjson  # Optional: faster connection-file and message parsing
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    orjson = None
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        """Serialize to compact UTF-8 JSON bytes, like orjson.dumps."""
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+# Project root, two levels above tests/python
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# Where start_kernel() puts the kernel's files unless told otherwise
+DEFAULT_TEST_DIR = Path("/tmp/llmspell-test")
+
+# PID of the daemon started by start_kernel(), read once from its PID file
+_kernel_pid = None
+
+# Connected clients handed out by shared_client(), keyed by connection file
+_clients = {}
+
+# debug_request header templates made by debug_request_msg(), keyed by
+# session id
+_header_templates = {}
+
+# IOPub topics the debugger tests care about; the kernel publishes
+# debug_event under its msg_type as the PUB topic. Status goes out as a
+# bare JSON frame with no topic, so there is no prefix to match it by.
+DEBUG_IOPUB_TOPICS = (b"debug_",)
+
+# Receive high-water mark for iopub; the default of 1000 frames can drop
+# debug events when a stepping burst outpaces the reader
+IOPUB_RCVHWM = 1 << 16
+
+class DebugKernelClient(BlockingKernelClient):
+    """BlockingKernelClient whose iopub socket holds bursts of debug events."""
+
+    def connect_iopub(self, identity=None):
+        # Same as the base class, but socket options are set before
+        # connect(), which is the only point where RCVHWM takes effect
+        sock = self.context.socket(zmq.SUB)
+        sock.setsockopt(zmq.RCVHWM, IOPUB_RCVHWM)
+        sock.setsockopt(zmq.IMMEDIATE, 1)
+        sock.linger = 0
+        if identity:
+            sock.identity = identity
+        sock.connect(self._make_url("iopub"))
+        sock.setsockopt(zmq.SUBSCRIBE, b"")
+        return sock
+
+@lru_cache(maxsize=None)
+def find_llmspell():
+    """Locate the llmspell binary, building it only when allowed and missing.
+
+    The result is cached: the binary does not move during a test session.
+    An executable named by LLMSPELL_BINARY is used without any lookup.
+    """
+    override = os.environ.get("LLMSPELL_BINARY")
+    if override and os.access(override, os.X_OK):
+        return Path(override)
+
+    for profile in ("debug", "release"):
+        candidate = REPO_ROOT / "target" / profile / "llmspell"
+        if candidate.exists():
+            return candidate
+
+    if os.environ.get("LLMSPELL_TEST_ALLOW_BUILD") == "1":
+        # The tests only need the CLI binary, not every target and feature
+        print("Building llmspell binary...")
+        result = subprocess.run(
+            ["cargo", "build", "--bin", "llmspell"],
+            cwd=REPO_ROOT,
+            timeout=300
+        )
+        candidate = REPO_ROOT / "target" / "debug" / "llmspell"
+        if result.returncode == 0 and candidate.exists():
+            return candidate
+
+    return None
+
+def start_kernel(test_dir=DEFAULT_TEST_DIR):
+    """Start kernel daemon and return connection info.
+
+    The connection, log and PID files go in test_dir. Give each concurrent
+    test session (e.g. each pytest-xdist worker) its own directory.
+    """
+    test_dir = Path(test_dir)
+    conn_file = test_dir / "kernel.json"
+    pid_file = test_dir / "kernel.pid"
+
+    # Clean up any existing kernel and wait until it has actually exited.
+    # A daemon left by an earlier run is found through its PID file; only
+    # in the shared default directory, and without one, do we fall back to
+    # scanning process command lines (which would hit other sessions' kernels).
+    stale_pid = _live_kernel_pid(pid_file)
+    if stale_pid is not None:
+        _terminate(stale_pid)
+    elif test_dir == DEFAULT_TEST_DIR:
+        stale = subprocess.run(["pgrep", "-f", "llmspell.*kernel"], capture_output=True, text=True)
+        subprocess.run(["pkill", "-f", "llmspell.*kernel"], capture_output=True)
+        for pid in stale.stdout.split():
+            wait_for_exit(int(pid))
+        for port_pid_file in Path("/tmp").glob("llmspell-kernel-port-*.pid"):
+            port_pid_file.unlink(missing_ok=True)
+    # The startup wait below must only ever see the new daemon's files
+    pid_file.unlink(missing_ok=True)
+    conn_file.unlink(missing_ok=True)
+
+    # Create test directory
+    if not test_dir.is_dir():
+        test_dir.mkdir(parents=True)
+
+    # Start kernel daemon - binary is in project root
+    llmspell_path = find_llmspell()
+    if llmspell_path is None:
+        print("Error: llmspell binary not found (set LLMSPELL_TEST_ALLOW_BUILD=1 to build it)")
+        return None
+
+    cmd = [
+        str(llmspell_path), "kernel", "start",
+        "--daemon",
+        "--port", "0",  # Let OS assign ports
+        "--connection-file", str(conn_file),
+        "--log-file", str(test_dir / "kernel.log"),
+        "--pid-file", str(pid_file),
+        "--idle-timeout", "0"
+    ]
+
+    print(f"Starting kernel: {' '.join(cmd)}")
+    # Our own fds are non-inheritable, so skip the close-all-fds walk on spawn
+    result = subprocess.run(cmd, capture_output=True, text=True, close_fds=False)
+
+    if result.returncode != 0:
+        print(f"Failed to start kernel: {result.stderr}")
+        return None
+
+    # Wait for the connection file, parsing it as soon as it is completely
+    # written. The daemon writes its PID file first; once it is there, sleep
+    # on a pidfd so a daemon that dies during startup ends the wait at once
+    # instead of after the full timeout.
+    conn_info = None
+    pid = pidfd = None
+    # Check again after 1ms, doubling up to 50ms: a kernel that comes up
+    # quickly is noticed quickly, a slow one does not cause a wakeup storm
+    delay = 0.001
+    deadline = time.monotonic() + 5
+    try:
+        while time.monotonic() < deadline:
+            try:
+                conn_info = json_loads(conn_file.read_bytes())
+                break
+            except FileNotFoundError:
+                pass
+            except json.JSONDecodeError:
+                pass  # Still being written
+
+            if pid is None:
+                pid = _read_pid(pid_file)
+                if pid is not None:
+                    pidfd = _open_pidfd(pid)
+
+            if pidfd is None:
+                time.sleep(delay)
+            elif select.select([pidfd], [], [], delay)[0]:
+                print("Kernel exited before writing its connection file")
+                return None
+            delay = min(delay * 2, 0.05)
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+
+    if conn_info is None:
+        print("Connection file not created")
+        return None
+
+    # Remember the daemon PID so stop_kernel() can wait for it to exit
+    global _kernel_pid
+    _kernel_pid = pid if pid is not None else _read_pid(pid_file)
+
+    print(f"Kernel started on ports: {conn_info['shell_port']}-{conn_info['hb_port']}")
+    return conn_info
+
+def stop_kernel(test_dir=DEFAULT_TEST_DIR):
+    """Stop kernel daemon."""
+    global _kernel_pid
+    pid = _kernel_pid
+    if pid is None:
+        pid = _live_kernel_pid(Path(test_dir) / "kernel.pid")
+
+    if pid is None and Path(test_dir) == DEFAULT_TEST_DIR:
+        subprocess.run(["pkill", "-f", "llmspell.*kernel"], capture_output=True)
+    elif pid is not None:
+        _terminate(pid)
+        _kernel_pid = None
+
+    print("Kernel stopped")
+
+def _read_pid(pid_file):
+    """Return the PID recorded in a PID file, or None if it is not there yet."""
+    try:
+        return int(pid_file.read_bytes())
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _live_kernel_pid(pid_file):
+    """Return the PID from a kernel PID file if that process is an llmspell.
+
+    Guards against a stale file whose PID has since been reused.
+    """
+    pid = _read_pid(pid_file)
+    if pid is None:
+        return None
+    try:
+        cmdline = Path(f"/proc/{pid}/cmdline").read_bytes()
+    except OSError:
+        return None
+    return pid if b"llmspell" in cmdline else None
+
+def _terminate(pid):
+    """SIGTERM a daemon and wait for it to exit.
+
+    The daemon runs in its own session; signal its whole process group so
+    any children it spawned go down with it.
+    """
+    try:
+        os.killpg(os.getpgid(pid), signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+    wait_for_exit(pid)
+
+def _open_pidfd(pid):
+    """Open a pidfd for a running process, or None if unsupported or gone."""
+    try:
+        return os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        return None
+
+def wait_for_exit(pid, timeout=5):
+    """Block until a process exits or the timeout elapses.
+
+    The daemon is not our child (it double-forks), so waitpid() cannot be
+    used; a pidfd becomes readable when the process exits instead.
+    """
+    try:
+        pidfd = os.pidfd_open(pid)
+    except ProcessLookupError:
+        return
+    except (AttributeError, OSError):
+        # No pidfd support (non-Linux or old kernel): poll for liveness
+        for _ in range(int(timeout / 0.1)):
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                return
+            time.sleep(0.1)
+        return
+
+    try:
+        select.select([pidfd], [], [], timeout)
+    finally:
+        os.close(pidfd)
+
+def connect_client(connection_file=DEFAULT_TEST_DIR / "kernel.json", context=None):
+    """Create a kernel client with started channels, ready for requests.
+
+    Clients share the process-wide ZMQ context unless one is given, instead
+    of each creating (and tearing down) its own IO thread.
+    """
+    client = DebugKernelClient(context=context or zmq.Context.instance())
+    client.load_connection_file(str(connection_file))
+    if orjson is not None:
+        # Session resolves these import paths; orjson emits bytes as required
+        client.session.packer = "orjson.dumps"
+        client.session.unpacker = "orjson.loads"
+    client.start_channels()
+    wait_for_kernel_info(client, timeout=10)
+    return client
+
+def wait_for_kernel_info(client, timeout=10):
+    """Block until the kernel answers a kernel_info_request on shell.
+
+    jupyter_client's wait_for_ready() also waits for an iopub message after
+    the reply, but this kernel publishes nothing on iopub for kernel_info,
+    so only the shell reply is awaited. The request is resent every second
+    in case the first one went out before the connection was up.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise RuntimeError(f"Kernel did not answer kernel_info within {timeout}s")
+        msg_id = client.kernel_info()
+        if wait_for_reply(client.shell_channel, msg_id, min(1, remaining)) is not None:
+            return
+
+def shared_client(connection_file=DEFAULT_TEST_DIR / "kernel.json", context=None):
+    """Return a connected client for a kernel, reusing one made earlier.
+
+    A reused client has its channels drained first, so callers never see
+    replies meant for someone else.
+    """
+    key = Path(connection_file)
+    client = _clients.get(key)
+    if client is None:
+        client = _clients[key] = connect_client(connection_file, context)
+    else:
+        drain_channels(client)
+    return client
+
+def close_clients():
+    """Stop the channels of every client made by shared_client()."""
+    for client in _clients.values():
+        client.stop_channels()
+    _clients.clear()
+
+def _pending_replies(channel):
+    """Replies read from a channel while waiting for some other reply.
+
+    Keyed by the msg_id of the request they answer, so picking one up
+    later is a dict lookup rather than a scan.
+    """
+    try:
+        return channel._pending_replies
+    except AttributeError:
+        channel._pending_replies = {}
+        return channel._pending_replies
+
+def collect_replies(channel, expected_ids, timeout=10):
+    """Collect replies to the given msg_ids from a channel, in any order.
+
+    Each get_msg() blocks until a message actually arrives. Messages that
+    answer something else are kept on the channel and handed out by later
+    calls. Returns a dict mapping msg_id to reply; ids whose reply did not
+    arrive before the timeout are missing from it.
+    """
+    pending = _pending_replies(channel)
+    replies = {
+        msg_id: pending.pop(msg_id) for msg_id in expected_ids if msg_id in pending
+    }
+
+    deadline = time.monotonic() + timeout
+    while len(replies) < len(expected_ids):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            msg = channel.get_msg(timeout=remaining)
+        except Empty:
+            break
+        parent_id = msg.get('parent_header', {}).get('msg_id')
+        if parent_id in expected_ids:
+            replies[parent_id] = msg
+        else:
+            pending[parent_id] = msg
+
+    return replies
+
+def wait_for_reply(channel, msg_id, timeout=10):
+    """Wait for the reply to one request, or return None on timeout."""
+    return collect_replies(channel, {msg_id}, timeout).get(msg_id)
+
+# Delimiter between routing identities and the signed part of a message
+WIRE_DELIMITER = b'<IDS|MSG>'
+
+# Serialized empty dict, for parent headers, metadata and content
+EMPTY_FRAME = json_dumps({})
+
+@lru_cache(maxsize=None)
+def make_signer(key):
+    """Precompute the HMAC-SHA256 state for a connection key.
+
+    Cached per key, so every test against the same kernel shares one
+    prototype. Callers must only copy() it, never update it directly.
+    """
+    return hmac.new(key, digestmod=hashlib.sha256)
+
+def sign_message(signer, parts):
+    """Sign serialized message parts using a copy of the precomputed HMAC state."""
+    h = signer.copy()
+    h.update(b''.join(parts))
+    return h.hexdigest()
+
+def wire_message(signer, header, parent_header=EMPTY_FRAME, metadata=EMPTY_FRAME,
+                 content=EMPTY_FRAME):
+    """Frame and sign a raw Jupyter message for send_multipart().
+
+    The header dict is serialized here; the other parts are passed already
+    serialized, since they are usually constant. Returns the delimiter,
+    signature, header, parent header, metadata and content frames.
+    """
+    parts = [json_dumps(header), parent_header, metadata, content]
+    return [WIRE_DELIMITER, sign_message(signer, parts).encode(), *parts]
+
+def ensure_script(directory, name, content):
+    """Write a test script once per distinct content and return its path.
+
+    The file name carries a hash of the content, so an unchanged script is
+    reused as is, and a changed one gets a new path rather than a rewrite
+    under a path the debugger may already have cached. content may be str
+    or bytes; pass bytes constants to skip encoding on every call.
+    """
+    if isinstance(content, str):
+        content = content.encode()
+    digest = hashlib.blake2b(content, digest_size=8).hexdigest()
+    name = Path(name)
+    target = Path(directory) / f"{name.stem}.{digest}{name.suffix}"
+    if not target.exists():
+        target.write_bytes(content)
+    return target
+
+def run_script(client, path):
+    """Execute a Lua script file in the kernel and return the msg_id.
+
+    The file is compiled with loadfile() into a global named after its
+    path the first time, and later runs call that function instead of
+    parsing the file again with dofile(). Paths from ensure_script()
+    change with the content, so a stale chunk is never reused.
+    """
+    chunk = "_chunk_" + hashlib.blake2b(str(path).encode(), digest_size=8).hexdigest()
+    code = f'{chunk} = {chunk} or assert(loadfile("{path}"))\n{chunk}()'
+    return client.execute(code, silent=False)
+
+def _debug_request_header(session):
+    """Header fields shared by every debug_request from a session."""
+    return {
+        'msg_type': 'debug_request',
+        'username': session.username,
+        'session': session.session,
+        'version': protocol_version,
+    }
+
+def debug_request_msg(session, command, arguments=None):
+    """Build a debug_request message without going through Session.msg().
+
+    Every debug_request has the same shape, so the header is copied from
+    a template made once per session; only the msg_id and date change
+    from call to call.
+    """
+    template = _header_templates.get(session.session)
+    if template is None:
+        template = _header_templates[session.session] = _debug_request_header(session)
+    header = template.copy()
+    header['msg_id'] = msg_id = str(uuid.uuid4())
+    header['date'] = datetime.now(timezone.utc)
+    return {
+        'header': header,
+        'msg_id': msg_id,
+        'msg_type': 'debug_request',
+        'parent_header': {},
+        'content': {
+            'command': command,
+            'arguments': arguments or {}
+        },
+        'metadata': {},
+    }
+
+def initialize_dap(client, client_id='llmspell_tests', timeout=10):
+    """Run the DAP initialize handshake and return its reply (None on timeout)."""
+    msg = debug_request_msg(client.session, 'initialize', {
+        'clientID': client_id,
+        'clientName': 'llmspell Python tests',
+        'linesStartAt1': True,
+        'columnsStartAt1': True
+    })
+    client.control_channel.send(msg)
+    return wait_for_reply(client.control_channel, msg['header']['msg_id'], timeout)
+
+def reset_dap(client, timeout=10):
+    """End the debug session a test launched; returns the disconnect reply.
+
+    The kernel's setBreakpoints only ever adds breakpoints, so an empty one
+    clears nothing; disconnect turns debug mode off, which stops leftover
+    breakpoints from pausing later executions. The bridge keeps answering
+    requests afterwards, so the session's initialize still holds.
+    """
+    msg = debug_request_msg(client.session, 'disconnect', {})
+    client.control_channel.send(msg)
+    return wait_for_reply(client.control_channel, msg['header']['msg_id'], timeout)
+
+@contextmanager
+def iopub_subscription(client, topics=DEBUG_IOPUB_TOPICS):
+    """Only receive iopub messages whose topic starts with one of topics.
+
+    Everything else (stream output of the debugged script, mostly) is
+    dropped by ZMQ before it is read and signature-checked. The catch-all
+    subscription is restored on exit.
+    """
+    sock = client.iopub_channel.socket
+    sock.setsockopt(zmq.UNSUBSCRIBE, b"")
+    for topic in topics:
+        sock.setsockopt(zmq.SUBSCRIBE, topic)
+    try:
+        yield sock
+    finally:
+        for topic in topics:
+            sock.setsockopt(zmq.UNSUBSCRIBE, topic)
+        sock.setsockopt(zmq.SUBSCRIBE, b"")
+
+def drain_channels(client):
+    """Discard any messages left on the client's channels by a previous test.
+
+    The kernel publishes some iopub output (stream, status) as a single JSON
+    frame without the <IDS|MSG> delimiter; get_msg() has already read such
+    a message off the socket when it fails to parse it, so it is skipped
+    like any other.
+    """
+    for channel in (client.iopub_channel, client.shell_channel, client.control_channel):
+        _pending_replies(channel).clear()
+        while True:
+            try:
+                channel.get_msg(timeout=0)
+            except Empty:
+                break
+            except ValueError:
+                continue
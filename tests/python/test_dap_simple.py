@@ -5,6 +5,8 @@ Tests debugging a Lua script with breakpoints, variable inspection, and stepping
 
 REQUIREMENTS:
 - llmspell binary built in ../../target/debug/ or ../../target/release/
+  (or point LLMSPELL_BINARY at a prebuilt binary)
+  (or set LLMSPELL_TEST_ALLOW_BUILD=1 to build just the binary if missing)
 - Python packages: pytest, jupyter_client (install via requirements.txt)
 - The test will automatically start a kernel daemon if needed
 - Requires ~15-20 seconds to complete
@@ -18,359 +20,258 @@ HOW IT WORKS:
 Task 10.7.9: Complete End-to-End DAP Testing with Lua Scripts
 """
 
-import json
-import subprocess
 import time
 import tempfile
-import os
-import signal
 from pathlib import Path
-from jupyter_client import BlockingKernelClient
-
-def start_kernel():
-    """Start kernel daemon and return connection info."""
-    # Clean up any existing kernel
-    subprocess.run(["pkill", "-f", "llmspell.*kernel"], capture_output=True)
-    subprocess.run(["rm", "-f", "/tmp/llmspell-kernel-port-*.pid"], capture_output=True)
-    time.sleep(1)
-
-    # Create test directory
-    test_dir = Path("/tmp/llmspell-test")
-    test_dir.mkdir(exist_ok=True)
-
-    # Start kernel daemon - binary is in project root
-    llmspell_path = "../../target/debug/llmspell"
-    if not Path(llmspell_path).exists():
-        # Try release build
-        llmspell_path = "../../target/release/llmspell"
-
-    cmd = [
-        llmspell_path, "kernel", "start",
-        "--daemon",
-        "--port", "0",  # Let OS assign ports
-        "--connection-file", "/tmp/llmspell-test/kernel.json",
-        "--log-file", "/tmp/llmspell-test/kernel.log",
-        "--idle-timeout", "0"
-    ]
-
-    print(f"Starting kernel: {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-
-    if result.returncode != 0:
-        print(f"Failed to start kernel: {result.stderr}")
-        return None
-
-    # Wait for connection file
-    conn_file = Path("/tmp/llmspell-test/kernel.json")
-    for _ in range(10):
-        if conn_file.exists():
-            break
-        time.sleep(0.5)
-    else:
-        print("Connection file not created")
-        return None
-
-    # Load connection info
-    with open(conn_file) as f:
-        conn_info = json.load(f)
-
-    print(f"Kernel started on ports: {conn_info['shell_port']}-{conn_info['hb_port']}")
-    return conn_info
-
-def stop_kernel():
-    """Stop kernel daemon."""
-    subprocess.run(["pkill", "-f", "llmspell.*kernel"], capture_output=True)
-    print("Kernel stopped")
+from queue import Empty
+import pytest
+import zmq
+from kernel_helpers import (
+    start_kernel, stop_kernel, connect_client, drain_channels, collect_replies,
+    initialize_dap, ensure_script, run_script, debug_request_msg, iopub_subscription,
+    wait_for_reply, reset_dap
+)
+
+# Lua script debugged by test_simple_breakpoint, kept as the bytes written
+LUA_SCRIPT = b"""-- Test script for debugging
+local x = 10
+local y = 20
+local z = x + y  -- Line 4: Set breakpoint here
+print("Result: " .. z)
+print("Done")
+"""
 
-def send_debug_request(client, command, arguments=None):
-    """Send a debug_request and get the reply."""
-    # Build the message using session
-    msg = client.session.msg(
-        'debug_request',
-        {
-            'command': command,
-            'arguments': arguments or {}
-        }
-    )
+def submit_debug_request(client, command, arguments=None):
+    """Send a debug_request without waiting and return its msg_id."""
+    # Build the message from the fixed debug_request shape
+    msg = debug_request_msg(client.session, command, arguments)
 
     # Send on control channel
     client.control_channel.send(msg)
 
-    # Get the message ID for matching the reply
-    msg_id = msg['header']['msg_id']
+    return msg['header']['msg_id']
 
-    # Wait for reply with matching msg_id
-    for _ in range(10):
+def drain_replies(client, expected_ids, timeout=10):
+    """Collect control replies for the given msg_ids, in any order.
+
+    Returns a dict mapping each msg_id to its reply; ids whose reply did
+    not arrive before the timeout are missing from the dict.
+    """
+    return collect_replies(client.control_channel, expected_ids, timeout)
+
+def iter_available(channel):
+    """Yield the messages already queued on a channel without blocking."""
+    while True:
         try:
-            reply = client.control_channel.get_msg(timeout=1)
-            if reply.get('parent_header', {}).get('msg_id') == msg_id:
-                return reply
-        except:
-            continue
-
-    return None
-
-def test_simple_breakpoint():
-    """Test a simple debug session with one breakpoint."""
-
-    # Start kernel
-    conn_info = start_kernel()
-    if not conn_info:
-        return False
-
-    try:
-        # Create Lua test script
-        test_script = Path("/tmp/test_debug.lua")
-        test_script.write_text("""-- Test script for debugging
-local x = 10
-local y = 20
-local z = x + y  -- Line 4: Set breakpoint here
-print("Result: " .. z)
-print("Done")
-""")
+            yield channel.get_msg(timeout=0)
+        except Empty:
+            return
 
-        # Create kernel client
-        client = BlockingKernelClient()
-        client.load_connection_file("/tmp/llmspell-test/kernel.json")
-        client.start_channels()
+def send_debug_batch(client, requests, timeout=10):
+    """Send several debug_requests back to back, then wait once for all.
 
-        # Give kernel a moment to be fully ready
-        time.sleep(1)
+    requests is a list of (command, arguments) pairs. Returns the replies
+    in the same order, with None for any that did not arrive in time.
+    """
+    msg_ids = [submit_debug_request(client, command, arguments) for command, arguments in requests]
+    replies = drain_replies(client, set(msg_ids), timeout)
+    return [replies.get(msg_id) for msg_id in msg_ids]
 
-        print("\n1. Testing DAP initialization...")
+def send_debug_request(client, command, arguments=None):
+    """Send a debug_request and get the reply."""
+    msg_id = submit_debug_request(client, command, arguments)
+    return drain_replies(client, {msg_id}).get(msg_id)
 
-        # Send DAP initialize request
-        reply = send_debug_request(client, 'initialize', {
-            'clientID': 'test_dap_simple',
-            'clientName': 'Simple DAP Test',
-            'linesStartAt1': True,
-            'columnsStartAt1': True
-        })
+def test_simple_breakpoint(kernel_client, dap_initialized, test_script_dir, debug_iopub, dap_reset):
+    """Test a simple debug session with one breakpoint.
 
-        if not reply:
-            print(f"  ✗ No reply received at all")
-            return False
+    debug_iopub keeps the script's print() output off the iopub socket, so
+    the wait for the stopped event only reads debug messages; dap_reset
+    disconnects the debugger afterwards.
+    """
+    client = kernel_client
 
-        if reply.get('msg_type') != 'debug_reply':
-            print(f"  ✗ Got {reply.get('msg_type')} instead of debug_reply")
-            print(f"     Full reply: {reply}")
-            return False
+    # Breakpoints are resolved by source path, so the script still needs a
+    # file; it is only written when its content changed
+    test_script = ensure_script(test_script_dir, "test_debug.lua", LUA_SCRIPT)
 
-        content = reply.get('content', {})
-        if 'body' in content:
-            caps = content['body']
-            print(f"  ✓ DAP initialized")
-            print(f"    - Supports breakpoints: {caps.get('supportsSetBreakpoints', False)}")
-            print(f"    - Supports stepping: {caps.get('supportsSteppingGranularity', False)}")
-        else:
-            print(f"  ✗ No capabilities in response: {content}")
-            return False
+    print("\n1. Testing DAP initialization...")
 
-        print("\n2. Setting breakpoint at line 4...")
+    # The handshake ran once for the session; check what it returned
+    reply = dap_initialized
 
-        # Set breakpoint
-        reply = send_debug_request(client, 'setBreakpoints', {
+    assert reply, "No reply to DAP initialize"
+    assert reply.get('msg_type') == 'debug_reply', \
+        f"Got {reply.get('msg_type')} instead of debug_reply: {reply}"
+
+    content = reply.get('content', {})
+    assert 'body' in content, f"No capabilities in response: {content}"
+    caps = content['body']
+    print(f"  ✓ DAP initialized")
+    print(f"    - Supports breakpoints: {caps.get('supportsSetBreakpoints', False)}")
+    print(f"    - Supports stepping: {caps.get('supportsSteppingGranularity', False)}")
+
+    print("\n2. Setting breakpoint at line 4...")
+
+    # Set the breakpoint and launch in one pipeline; the kernel handles
+    # control requests in order, so launch still sees the breakpoint
+    reply, launch_reply = send_debug_batch(client, [
+        ('setBreakpoints', {
             'source': {
                 'path': str(test_script)
             },
             'breakpoints': [{'line': 4}]
-        })
-
-        if not reply:
-            print(f"  ✗ No reply received")
-            return False
-
-        content = reply.get('content', {})
-        if 'body' in content and 'breakpoints' in content['body']:
-            bps = content['body']['breakpoints']
-            if bps and bps[0].get('verified'):
-                print(f"  ✓ Breakpoint set at line {bps[0].get('line')}")
-            else:
-                print(f"  ✗ Breakpoint not verified: {bps}")
-                return False
-        else:
-            print(f"  ✗ No breakpoints in response: {content}")
-            return False
-
-        print("\n3. Launching debug session...")
-
-        # Launch debug session
-        reply = send_debug_request(client, 'launch', {
+        }),
+        ('launch', {
             'program': str(test_script),
             'stopOnEntry': False,
             'noDebug': False
-        })
-
-        if reply:
-            print(f"  ✓ Debug session launched")
-        else:
-            print(f"  ✗ Failed to launch")
-            return False
-
-        print("\n4. Executing script (should hit breakpoint)...")
-
-        # Execute the script
-        exec_msg_id = client.execute(f'dofile("{test_script}")', silent=False)
-
-        # Wait for stopped event on IOPub channel
-        stopped = False
-        for _ in range(10):
-            try:
-                msg = client.get_iopub_msg(timeout=1)
-                if msg['msg_type'] == 'debug_event':
-                    event = msg['content'].get('event')
-                    if event == 'stopped':
-                        stopped = True
-                        print(f"  ✓ Hit breakpoint at line {msg['content'].get('body', {}).get('line', '?')}")
-                        break
-            except:
-                continue
-
-        if not stopped:
-            print("  ✗ Breakpoint not hit (no stopped event)")
-            # Try to get execute result anyway
-            try:
-                exec_reply = client.get_shell_msg(timeout=2)
-                print(f"  Script executed without stopping: {exec_reply.get('content', {}).get('status')}")
-            except:
-                print("  Script execution timed out")
-            return False
-
-        print("\n5. Getting stack trace...")
-
-        # Get stack trace
-        reply = send_debug_request(client, 'stackTrace', {
-            'threadId': 1
-        })
-
-        if reply:
-            content = reply.get('content', {})
-            if 'body' in content and 'stackFrames' in content['body']:
-                frames = content['body']['stackFrames']
-                if frames:
-                    print(f"  ✓ Stack frame: {frames[0].get('name')} at line {frames[0].get('line')}")
-                else:
-                    print(f"  ✗ No stack frames")
-            else:
-                print(f"  ✗ No stack trace in response")
-
-        print("\n6. Inspecting variables...")
-
-        # Get scopes
-        reply = send_debug_request(client, 'scopes', {
-            'frameId': 1
-        })
-
-        if reply:
-            content = reply.get('content', {})
-            if 'body' in content and 'scopes' in content['body']:
-                scopes = content['body']['scopes']
-                if scopes:
-                    # Get variables from local scope
-                    scope_ref = scopes[0].get('variablesReference')
-
-                    reply = send_debug_request(client, 'variables', {
-                        'variablesReference': scope_ref
-                    })
-
-                    if reply:
-                        content = reply.get('content', {})
-                        if 'body' in content and 'variables' in content['body']:
-                            vars = content['body']['variables']
-                            print(f"  ✓ Variables:")
-                            for var in vars:
-                                if var['name'] in ['x', 'y', 'z']:
-                                    print(f"    - {var['name']} = {var['value']}")
-                        else:
-                            print(f"  ✗ No variables in response")
-            else:
-                print(f"  ✗ No scopes in response")
-
-        print("\n7. Continuing execution...")
-
-        # Continue execution
-        reply = send_debug_request(client, 'continue', {
-            'threadId': 1
-        })
-
-        if reply:
-            print(f"  ✓ Execution continued")
-        else:
-            print(f"  ✗ Failed to continue")
-
-        # Get final output
-        try:
-            exec_reply = client.get_shell_msg(timeout=5)
-            if exec_reply['content'].get('status') == 'ok':
-                print(f"  ✓ Script completed successfully")
-            else:
-                print(f"  ✗ Script failed: {exec_reply['content']}")
-        except:
-            print(f"  ✗ No execution reply received")
-
-        client.stop_channels()
-        return True
-
-    except Exception as e:
-        print(f"\n✗ Test failed with error: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+        }),
+    ])
+
+    assert reply, "No reply to setBreakpoints"
+    content = reply.get('content', {})
+    assert 'breakpoints' in content.get('body', {}), f"No breakpoints in response: {content}"
+    bps = content['body']['breakpoints']
+    assert bps and bps[0].get('verified'), f"Breakpoint not verified: {bps}"
+    print(f"  ✓ Breakpoint set at line {bps[0].get('line')}")
+
+    print("\n3. Launching debug session...")
+
+    # Launch reply was collected with the breakpoint reply
+    assert launch_reply, "No reply to launch"
+    print(f"  ✓ Debug session launched")
+
+    print("\n4. Executing script (should hit breakpoint)...")
+
+    # Execute the script
+    exec_msg_id = run_script(client, test_script)
+
+    # Wait for the stopped event on IOPub, watching shell as well so a
+    # script that runs to completion without stopping ends the wait
+    stopped = False
+    exec_reply = None
+    poller = zmq.Poller()
+    poller.register(client.iopub_channel.socket, zmq.POLLIN)
+    poller.register(client.shell_channel.socket, zmq.POLLIN)
+    deadline = time.monotonic() + 10
+    while not stopped and exec_reply is None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        ready = dict(poller.poll(int(remaining * 1000)))
+
+        if client.iopub_channel.socket in ready:
+            for msg in iter_available(client.iopub_channel):
+                if msg['msg_type'] == 'debug_event' and msg['content'].get('event') == 'stopped':
+                    stopped = True
+                    print(f"  ✓ Hit breakpoint at line {msg['content'].get('body', {}).get('line', '?')}")
+                    break
+
+        if not stopped and client.shell_channel.socket in ready:
+            for msg in iter_available(client.shell_channel):
+                if msg.get('parent_header', {}).get('msg_id') == exec_msg_id:
+                    exec_reply = msg
+                    break
+
+    if not stopped:
+        if exec_reply is not None:
+            pytest.fail("Breakpoint not hit; script executed without stopping: "
+                        f"{exec_reply.get('content', {}).get('status')}")
+        pytest.fail("Breakpoint not hit; script execution timed out")
+
+    print("\n5. Getting stack trace...")
+
+    # One llmspellInspect request returns the stack trace, the scopes of
+    # the frame and the variables of its first scope together
+    reply = send_debug_request(client, 'llmspellInspect', {
+        'threadId': 1,
+        'frameId': 1
+    })
+    assert reply, "No reply to llmspellInspect"
+    body = reply.get('content', {}).get('body', {})
+
+    frames = body.get('stackFrames')
+    assert frames, f"No stack frames in response: {body}"
+    print(f"  ✓ Stack frame: {frames[0].get('name')} at line {frames[0].get('line')}")
+
+    print("\n6. Inspecting variables...")
+
+    assert body.get('scopes'), f"No scopes in response: {body}"
+    assert 'variables' in body, f"No variables in response: {body}"
+    print(f"  ✓ Variables:")
+    for var in body['variables']:
+        if var['name'] in ['x', 'y', 'z']:
+            print(f"    - {var['name']} = {var['value']}")
+
+    print("\n7. Continuing execution...")
+
+    # Continue execution
+    reply = send_debug_request(client, 'continue', {
+        'threadId': 1
+    })
+
+    assert reply, "No reply to continue"
+    print(f"  ✓ Execution continued")
+
+    # Get final output
+    exec_reply = wait_for_reply(client.shell_channel, exec_msg_id, timeout=5)
+    assert exec_reply is not None, "No execution reply received"
+    assert exec_reply['content'].get('status') == 'ok', f"Script failed: {exec_reply['content']}"
+    print(f"  ✓ Script completed successfully")
+
+def test_performance(kernel_client):
+    """Test DAP performance requirements."""
+    client = kernel_client
 
-    finally:
-        stop_kernel()
+    print("\nPerformance Testing:")
 
-def test_performance():
-    """Test DAP performance requirements."""
+    # Test initialization performance. The client is already connected, so
+    # this times only the initialize round trip, not client startup.
+    start_time = time.perf_counter()
 
-    # Start kernel
-    conn_info = start_kernel()
-    if not conn_info:
-        return False
-
-    try:
-        # Create kernel client
-        client = BlockingKernelClient()
-        client.load_connection_file("/tmp/llmspell-test/kernel.json")
-        client.start_channels()
-
-        print("\nPerformance Testing:")
-
-        # Test initialization performance
-        start_time = time.time()
-
-        reply = send_debug_request(client, 'initialize', {
-            'clientID': 'perf_test'
-        })
-
-        if reply:
-            init_time = (time.time() - start_time) * 1000
-            print(f"  DAP initialization: {init_time:.1f}ms (requirement: <50ms)")
-
-            if init_time < 50:
-                print(f"  ✓ Performance requirement met")
-                return True
-            else:
-                print(f"  ✗ Too slow")
-                return False
-        else:
-            print(f"  ✗ Failed to initialize")
-            return False
+    reply = send_debug_request(client, 'initialize', {
+        'clientID': 'perf_test'
+    })
 
-    finally:
-        client.stop_channels()
-        stop_kernel()
+    assert reply, "Failed to initialize"
+    init_time = (time.perf_counter() - start_time) * 1000
+    print(f"  DAP initialization: {init_time:.1f}ms (requirement: <50ms)")
+    assert init_time < 50, f"DAP initialization too slow: {init_time:.1f}ms"
+    print(f"  ✓ Performance requirement met")
 
 if __name__ == "__main__":
     print("="*60)
     print("Task 10.7.9: End-to-End DAP Testing with Lua Scripts")
     print("="*60)
 
-    # Test 1: Simple breakpoint session
-    success1 = test_simple_breakpoint()
+    def run(name, test, *args):
+        """Run one test function; a failed assertion is reported, not raised."""
+        try:
+            test(*args)
+        except (AssertionError, pytest.fail.Exception) as e:
+            print(f"\n✗ {name} failed: {e}")
+            return False
+        return True
 
-    # Test 2: Performance
-    success2 = test_performance()
+    # Both tests share one kernel and client, as under pytest
+    success1 = success2 = False
+    if start_kernel():
+        client = connect_client()
+        try:
+            # Test 1: Simple breakpoint session
+            init_reply = initialize_dap(client)
+            with iopub_subscription(client) as iopub:
+                success1 = run("Simple breakpoint session", test_simple_breakpoint,
+                               client, init_reply, Path(tempfile.mkdtemp()), iopub, None)
+            reset_dap(client)
+            drain_channels(client)
+
+            # Test 2: Performance
+            success2 = run("Performance", test_performance, client)
+        finally:
+            client.stop_channels()
+            stop_kernel()
 
     print("\n" + "="*60)
     print("Test Results:")
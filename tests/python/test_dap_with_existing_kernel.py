@@ -1,119 +1,152 @@
 #!/usr/bin/env python3
 """
-Test DAP with existing kernel or start one if needed.
+Test a complete DAP workflow on a persistent kernel session.
 
 REQUIREMENTS:
 - llmspell binary built in ../../target/debug/ or ../../target/release/
+  (or point LLMSPELL_BINARY at a prebuilt binary)
 - Python packages: pytest, jupyter_client
-- Will reuse existing kernel at /tmp/llmspell-test/kernel.json if available
-- Otherwise starts a new kernel daemon automatically
+- Under pytest it runs on the session's kernel daemon and client; run
+  directly it starts a kernel in /tmp/llmspell-test and stops it afterwards
 
 This test demonstrates using DAP with a persistent kernel session,
 which is useful for interactive debugging workflows.
 """
 
-import json
+import tempfile
 import time
-import subprocess
-import os
+from collections import deque
 from pathlib import Path
-from jupyter_client import BlockingKernelClient
+import pytest
+import zmq
+from kernel_helpers import (
+    ensure_script, run_script, debug_request_msg, shared_client, close_clients, start_kernel,
+    stop_kernel, WIRE_DELIMITER
+)
+
+# Lua script debugged by test_dap_workflow, kept as the bytes written
+LUA_SCRIPT = b"""-- Test script for debugging
+local x = 10
+local y = 20
+local z = x + y  -- Line 4: Set breakpoint here
+print("Result: " .. z)
+print("Done")
+"""
 
-def send_debug_request(client, command, arguments=None):
+def send_debug_request(client, command, arguments=None, timeout=10):
     """Send a debug_request and get the reply."""
-    msg = client.session.msg(
-        'debug_request',
-        {
-            'command': command,
-            'arguments': arguments or {}
-        }
-    )
-
-    client.control_channel.send(msg)
+    msg = debug_request_msg(client.session, command, arguments)
+
+    # Sign and send straight onto the control socket. debug_request has to
+    # stay on control: the kernel rejects it on shell.
+    client.session.send(client.control_channel.socket, msg)
     msg_id = msg['header']['msg_id']
 
-    # Wait for reply with matching msg_id
-    for _ in range(10):
+    if not pump(client, lambda: msg_id in _control_replies, timeout):
+        return None
+    return _control_replies.pop(msg_id)
+
+# Messages read by pump(), waiting for the helper that wants them:
+# control replies by parent msg_id, shell replies and debug events in order.
+# Nobody asks for most shell replies and debug events (continued, output,
+# ...), so those two are rings that keep only the most recent messages.
+BACKLOG_SIZE = 256
+_control_replies = {}
+_shell_backlog = deque(maxlen=BACKLOG_SIZE)
+_debug_events = deque(maxlen=BACKLOG_SIZE)
+
+def _recv_ready(client, sock):
+    """Read every message already queued on a socket, without blocking.
+
+    Frames are read and deserialized right here in the calling thread,
+    with no detour through the channel's message queue. The kernel sends
+    stream and status output on IOPub as one bare JSON frame without the
+    <IDS|MSG> delimiter; such frames are dropped, having been read already.
+    """
+    session = client.session
+    messages = []
+    while True:
         try:
-            reply = client.control_channel.get_msg(timeout=1)
-            if reply.get('parent_header', {}).get('msg_id') == msg_id:
-                return reply
-        except:
+            frames = sock.recv_multipart(zmq.NOBLOCK)
+        except zmq.Again:
+            return messages
+        if WIRE_DELIMITER not in frames:
             continue
-
+        _, frames = session.feed_identities(frames)
+        messages.append(session.deserialize(frames))
+
+def _on_control(msg):
+    _control_replies[msg.get('parent_header', {}).get('msg_id')] = msg
+
+def _on_iopub(msg):
+    # Only debug events are waited for; other IOPub traffic is dropped
+    if msg['msg_type'] == 'debug_event':
+        _debug_events.append(msg)
+
+def pump(client, done, timeout=10):
+    """Read control, shell and IOPub together until done() is true.
+
+    One poller watches all three sockets and whatever is readable is
+    sorted into the backlogs above, so waiting on one channel never lets
+    the others back up. Returns done()'s final value; timeout=0 just reads
+    what is already queued.
+    """
+    sockets = {
+        client.control_channel.socket: _on_control,
+        client.shell_channel.socket: _shell_backlog.append,
+        client.iopub_channel.socket: _on_iopub,
+    }
+    poller = zmq.Poller()
+    for sock in sockets:
+        poller.register(sock, zmq.POLLIN)
+    deadline = time.monotonic() + timeout
+    while not done():
+        remaining = deadline - time.monotonic()
+        ready = dict(poller.poll(max(0, int(remaining * 1000))))
+        if not ready:
+            break
+        for sock, handle in sockets.items():
+            if sock in ready:
+                for msg in _recv_ready(client, sock):
+                    handle(msg)
+    return done()
+
+def _take(backlog, match):
+    """Remove and return the first message in backlog that matches, if any."""
+    for msg in backlog:
+        if match(msg):
+            backlog.remove(msg)
+            return msg
     return None
 
-def start_kernel_if_needed():
-    """Start kernel if not already running."""
-    conn_file = Path("/tmp/llmspell-test/kernel.json")
-    if conn_file.exists():
-        # Kernel might already be running
-        return True
-
-    # Create test directory
-    test_dir = Path("/tmp/llmspell-test")
-    test_dir.mkdir(exist_ok=True)
-
-    # Start kernel daemon - binary is in project root
-    llmspell_path = "../../target/debug/llmspell"
-    if not Path(llmspell_path).exists():
-        # Try release build
-        llmspell_path = "../../target/release/llmspell"
-        if not Path(llmspell_path).exists():
-            print(f"Error: llmspell binary not found")
-            return False
-
-    cmd = [
-        llmspell_path, "kernel", "start",
-        "--daemon",
-        "--port", "0",
-        "--connection-file", "/tmp/llmspell-test/kernel.json",
-        "--log-file", "/tmp/llmspell-test/kernel.log",
-        "--idle-timeout", "0"
-    ]
-
-    print(f"Starting kernel: {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-
-    if result.returncode != 0:
-        print(f"Failed to start kernel: {result.stderr}")
-        return False
-
-    # Wait for connection file
-    for _ in range(10):
-        if conn_file.exists():
-            print(f"Kernel started, connection file: {conn_file}")
-            return True
-        time.sleep(0.5)
-
-    print("Timeout waiting for kernel to start")
-    return False
-
-def test_dap_workflow():
-    # Ensure kernel is running
-    if not start_kernel_if_needed():
-        print("Failed to ensure kernel is running")
-        import pytest
-        pytest.skip("Kernel not available")
+def wait_for_event(client, event, timeout=10):
+    """Wait for a debug_event on IOPub and return it, or None on timeout."""
+    def match(msg):
+        return msg['content'].get('event') == event
+    pump(client, lambda: any(match(msg) for msg in _debug_events), timeout)
+    return _take(_debug_events, match)
+
+def get_shell_reply(client, msg_id, timeout=10):
+    """Return the shell reply to a request, or None on timeout."""
+    def match(msg):
+        return msg.get('parent_header', {}).get('msg_id') == msg_id
+    pump(client, lambda: any(match(msg) for msg in _shell_backlog), timeout)
+    return _take(_shell_backlog, match)
+
+def test_dap_workflow(kernel_client, test_script_dir, dap_reset):
     """Test complete DAP workflow."""
 
     print("DAP Workflow Test (Using Existing Kernel)")
     print("="*50)
 
-    # Create Lua test script
-    test_script = Path("/tmp/test_debug.lua")
-    test_script.write_text("""-- Test script for debugging
-local x = 10
-local y = 20
-local z = x + y  -- Line 4: Set breakpoint here
-print("Result: " .. z)
-print("Done")
-""")
+    # Create Lua test script (reused while its content is unchanged)
+    test_script = ensure_script(test_script_dir, "test_debug.lua", LUA_SCRIPT)
 
-    # Create kernel client
-    client = BlockingKernelClient()
-    client.load_connection_file("/tmp/llmspell-test/kernel.json")
-    client.start_channels()
+    # Kernel client, shared with other tests using this kernel; it is only
+    # handed out once a kernel_info reply has arrived on shell (see
+    # wait_for_kernel_info), so the first debug_request is not sent into
+    # channels still connecting
+    client = kernel_client
 
     print("\n1. Testing DAP initialization...")
 
@@ -124,16 +157,14 @@ print("Done")
         'columnsStartAt1': True
     })
 
-    if not reply or reply.get('msg_type') != 'debug_reply':
-        print(f"  ✗ Failed: {reply}")
-        return False
+    assert reply and reply.get('msg_type') == 'debug_reply', f"DAP initialize failed: {reply}"
 
     content = reply.get('content', {})
-    if content.get('success'):
-        print(f"  ✅ DAP initialized")
-        caps = content.get('body', {})
-        print(f"     Supports breakpoints: {caps.get('supportsConditionalBreakpoints')}")
-        print(f"     Supports stepping: {caps.get('supportsSteppingGranularity')}")
+    assert content.get('success'), f"DAP initialize failed: {content}"
+    print(f"  ✅ DAP initialized")
+    caps = content.get('body', {})
+    print(f"     Supports breakpoints: {caps.get('supportsConditionalBreakpoints')}")
+    print(f"     Supports stepping: {caps.get('supportsSteppingGranularity')}")
 
     print("\n2. Setting breakpoint at line 4...")
 
@@ -144,14 +175,10 @@ print("Done")
         'breakpoints': [{'line': 4}]
     })
 
-    if reply and reply.get('content', {}).get('success'):
-        bps = reply['content'].get('body', {}).get('breakpoints', [])
-        if bps and bps[0].get('verified'):
-            print(f"  ✅ Breakpoint set and verified")
-        else:
-            print(f"  ✗ Breakpoint not verified")
-    else:
-        print(f"  ✗ Failed to set breakpoint")
+    assert reply and reply.get('content', {}).get('success'), f"Failed to set breakpoint: {reply}"
+    bps = reply['content'].get('body', {}).get('breakpoints', [])
+    assert bps and bps[0].get('verified'), f"Breakpoint not verified: {bps}"
+    print(f"  ✅ Breakpoint set and verified")
 
     print("\n3. Launching debug session...")
 
@@ -161,117 +188,106 @@ print("Done")
         'noDebug': False
     })
 
-    if reply and reply.get('content', {}).get('success'):
-        print(f"  ✅ Debug session launched")
-    else:
-        print(f"  ✗ Failed to launch")
+    assert reply and reply.get('content', {}).get('success'), f"Failed to launch: {reply}"
+    print(f"  ✅ Debug session launched")
 
     print("\n4. Executing script...")
 
     # This should hit the breakpoint
-    exec_msg_id = client.execute(f'dofile("{test_script}")', silent=False)
+    exec_msg_id = run_script(client, test_script)
     print(f"  Sent execute with msg_id: {exec_msg_id}")
 
     # Wait for stopped event
     print("\n5. Waiting for breakpoint hit...")
-    stopped = False
-    for _ in range(10):
-        try:
-            msg = client.get_iopub_msg(timeout=1)
-            if msg['msg_type'] == 'debug_event':
-                event = msg['content'].get('event')
-                if event == 'stopped':
-                    stopped = True
-                    print(f"  ✅ Hit breakpoint!")
-                    body = msg['content'].get('body', {})
-                    print(f"     Reason: {body.get('reason')}")
-                    print(f"     Line: {body.get('line')}")
-                    break
-        except:
-            pass
-
-    if not stopped:
-        print("  ⚠️  Breakpoint not hit, checking if script completed...")
-        try:
-            exec_reply = client.get_shell_msg(timeout=2)
-            status = exec_reply.get('content', {}).get('status')
-            print(f"  Script status: {status}")
-            if status == 'ok':
-                print("  Note: Script ran without stopping at breakpoint")
-        except:
-            print("  No execution reply")
-
-    if stopped:
-        print("\n6. Getting stack trace...")
-        reply = send_debug_request(client, 'stackTrace', {
-            'threadId': 1
-        })
-
-        if reply and reply.get('content', {}).get('success'):
-            frames = reply['content'].get('body', {}).get('stackFrames', [])
-            if frames:
-                print(f"  ✅ Stack frame: {frames[0].get('name')} at line {frames[0].get('line')}")
-
-        print("\n7. Inspecting variables...")
-        reply = send_debug_request(client, 'scopes', {
-            'frameId': 1
-        })
-
-        if reply and reply.get('content', {}).get('success'):
-            scopes = reply['content'].get('body', {}).get('scopes', [])
-            if scopes:
-                scope_ref = scopes[0].get('variablesReference')
-
-                reply = send_debug_request(client, 'variables', {
-                    'variablesReference': scope_ref
-                })
-
-                if reply and reply.get('content', {}).get('success'):
-                    vars = reply['content'].get('body', {}).get('variables', [])
-                    print(f"  ✅ Variables:")
-                    for var in vars:
-                        if var['name'] in ['x', 'y', 'z']:
-                            print(f"     {var['name']} = {var['value']}")
-
-        print("\n8. Continuing execution...")
-        reply = send_debug_request(client, 'continue', {
-            'threadId': 1
-        })
-
-        if reply and reply.get('content', {}).get('success'):
-            print(f"  ✅ Resumed execution")
-
-        # Get final result
-        try:
-            exec_reply = client.get_shell_msg(timeout=2)
-            if exec_reply['content'].get('status') == 'ok':
-                print(f"  ✅ Script completed")
-        except:
-            pass
+    msg = wait_for_event(client, 'stopped')
+    if msg is None:
+        exec_reply = get_shell_reply(client, exec_msg_id, timeout=2)
+        if exec_reply:
+            pytest.fail("Breakpoint not hit; script ran to completion with status "
+                        f"{exec_reply.get('content', {}).get('status')}")
+        pytest.fail("Breakpoint not hit and no execution reply")
+    print(f"  ✅ Hit breakpoint!")
+    body = msg['content'].get('body', {})
+    print(f"     Reason: {body.get('reason')}")
+    print(f"     Line: {body.get('line')}")
+
+    print("\n6. Getting stack trace...")
+    reply = send_debug_request(client, 'stackTrace', {
+        'threadId': 1
+    })
+
+    assert reply and reply.get('content', {}).get('success'), f"stackTrace failed: {reply}"
+    frames = reply['content'].get('body', {}).get('stackFrames', [])
+    assert frames, "No stack frames"
+    print(f"  ✅ Stack frame: {frames[0].get('name')} at line {frames[0].get('line')}")
+
+    print("\n7. Inspecting variables...")
+    reply = send_debug_request(client, 'scopes', {
+        'frameId': 1
+    })
+
+    assert reply and reply.get('content', {}).get('success'), f"scopes failed: {reply}"
+    scopes = reply['content'].get('body', {}).get('scopes', [])
+    assert scopes, "No scopes"
+    scope_ref = scopes[0].get('variablesReference')
+
+    reply = send_debug_request(client, 'variables', {
+        'variablesReference': scope_ref
+    })
+
+    assert reply and reply.get('content', {}).get('success'), f"variables failed: {reply}"
+    vars = reply['content'].get('body', {}).get('variables', [])
+    print(f"  ✅ Variables:")
+    for var in vars:
+        if var['name'] in ['x', 'y', 'z']:
+            print(f"     {var['name']} = {var['value']}")
+
+    print("\n8. Continuing execution...")
+    reply = send_debug_request(client, 'continue', {
+        'threadId': 1
+    })
+
+    assert reply and reply.get('content', {}).get('success'), f"continue failed: {reply}"
+    print(f"  ✅ Resumed execution")
+
+    # Get final result
+    exec_reply = get_shell_reply(client, exec_msg_id, timeout=2)
+    assert exec_reply is not None, "No execution reply received"
+    assert exec_reply['content'].get('status') == 'ok', f"Script failed: {exec_reply['content']}"
+    print(f"  ✅ Script completed")
 
     print("\n9. Testing performance...")
 
-    start_time = time.time()
+    # Read whatever the script left queued first, so the timing covers only
+    # the initialize round trip
+    pump(client, lambda: False, timeout=0)
+    start_time = time.perf_counter()
     reply = send_debug_request(client, 'initialize', {
         'clientID': 'perf_test'
     })
 
     if reply:
-        elapsed_ms = (time.time() - start_time) * 1000
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
         print(f"  DAP init time: {elapsed_ms:.1f}ms")
         if elapsed_ms < 50:
             print(f"  ✅ Performance requirement met")
         else:
             print(f"  ⚠️  Slower than 50ms requirement")
 
-    client.stop_channels()
-
     print("\n" + "="*50)
     print("✅ Test completed successfully!")
-    return True
 
 if __name__ == "__main__":
-    success = test_dap_workflow()
+    success = False
+    if start_kernel():
+        try:
+            test_dap_workflow(shared_client(), Path(tempfile.mkdtemp()), None)
+            success = True
+        except (AssertionError, pytest.fail.Exception) as e:
+            print(f"✗ {e}")
+        finally:
+            close_clients()
+            stop_kernel()
     if not success:
         print("❌ Test failed")
         exit(1)
\ No newline at end of file
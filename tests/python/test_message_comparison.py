@@ -5,71 +5,150 @@ This will help identify why control channel messages from jupyter_client aren't
 """
 
 import json
+import os
 import zmq
 import time
-import hmac
-import hashlib
 import uuid
 from pathlib import Path
-from datetime import datetime
+from queue import Empty
+from functools import lru_cache
 from jupyter_client import BlockingKernelClient
+from kernel_helpers import (
+    json_dumps, shared_client, close_clients, WIRE_DELIMITER, make_signer, wire_message
+)
 import threading
 
+CONNECTION_FILE = "/tmp/llmspell-test/kernel.json"
+
+# Header date of the raw debug_request; the kernel does not check it, so
+# it is formatted once when the module is loaded
+_STATIC_DATE = time.strftime("%Y-%m-%dT%H:%M:%S.000000Z", time.gmtime())
+
+# High-water marks of the capturing proxy's sockets, so bursts queue up
+# instead of stalling or being dropped at the default of 1000 messages
+PROXY_HWM = 100_000
+
+# Content of the raw debug_request, serialized once
+_DAP_INITIALIZE = json_dumps({
+    "command": "initialize",
+    "arguments": {
+        "clientID": "message_comparison",
+        "linesStartAt1": True
+    }
+})
+
+@lru_cache(maxsize=1)
+def _load_conn():
+    """Connection info of the running kernel, read once for all tests."""
+    with open(CONNECTION_FILE) as f:
+        return json.load(f)
+
+def _direction(msg):
+    """Tell a captured request from a reply by its header's msg_type."""
+    try:
+        header = json.loads(msg[msg.index(WIRE_DELIMITER) + 2])
+    except (ValueError, IndexError):
+        return 'unknown'
+    return 'client->kernel' if header.get('msg_type', '').endswith('_request') else 'kernel->client'
+
 # Intercept messages with a proxy
 class MessageCapture:
     def __init__(self):
         self.messages = []
         self.context = zmq.Context()
+        # Set once a client message has been captured
+        self.first_message = threading.Event()
+        # Control socket of the running proxy and its threads, for stop()
+        self._control = None
+        self._threads = []
 
     def create_proxy(self, frontend_port, backend_port):
         """Create a proxy to capture messages between client and kernel."""
         # Frontend socket (clients connect here)
         frontend = self.context.socket(zmq.ROUTER)
+        frontend.setsockopt(zmq.LINGER, 0)
+        frontend.setsockopt(zmq.RCVHWM, PROXY_HWM)
+        frontend.setsockopt(zmq.SNDHWM, PROXY_HWM)
         frontend.bind(f"tcp://127.0.0.1:{frontend_port}")
 
         # Backend socket (connects to real kernel)
         backend = self.context.socket(zmq.DEALER)
+        backend.setsockopt(zmq.LINGER, 0)
+        backend.setsockopt(zmq.RCVHWM, PROXY_HWM)
+        backend.setsockopt(zmq.SNDHWM, PROXY_HWM)
+        # Queue nothing for the kernel until the connection is up
+        backend.setsockopt(zmq.IMMEDIATE, 1)
         backend.connect(f"tcp://127.0.0.1:{backend_port}")
 
-        # Proxy and capture
-        poller = zmq.Poller()
-        poller.register(frontend, zmq.POLLIN)
-        poller.register(backend, zmq.POLLIN)
+        # libzmq forwards between frontend and backend itself (zmq.proxy
+        # releases the GIL), and sends a copy of every message to the
+        # capture socket; Python only reads those copies for logging.
+        # Frames are forwarded untouched, routing ID included.
+        capture_addr = f"inproc://capture-{frontend_port}"
+        capture = self.context.socket(zmq.PAIR)
+        # A full capture pipe would block the proxy, and with it all
+        # forwarding, until the logging thread caught up
+        capture.setsockopt(zmq.SNDHWM, PROXY_HWM)
+        capture.bind(capture_addr)
+        listener = self.context.socket(zmq.PAIR)
+        listener.connect(capture_addr)
+
+        # stop() sends TERMINATE here; the proxy returns instead of running
+        # until the process exits
+        control_addr = f"inproc://control-{frontend_port}"
+        proxy_control = self.context.socket(zmq.PAIR)
+        proxy_control.bind(control_addr)
+        self._control = self.context.socket(zmq.PAIR)
+        self._control.connect(control_addr)
 
         def run_proxy():
+            zmq.proxy_steerable(frontend, backend, capture, proxy_control)
+            # An empty frame tells the logging thread the proxy has stopped
+            capture.send(b'')
+            for sock in (frontend, backend, capture, proxy_control):
+                sock.close()
+
+        def log_captured():
             while True:
-                socks = dict(poller.poll(100))
-
-                if frontend in socks:
-                    # Message from client to kernel
-                    msg = frontend.recv_multipart()
-                    print(f"\n📤 Client->Kernel ({len(msg)} parts):")
-                    for i, part in enumerate(msg):
-                        if len(part) < 100:
-                            try:
-                                # Try to decode as string
-                                decoded = part.decode('utf-8')
-                                print(f"  Part {i} (string): {decoded[:100]}")
-                            except:
-                                print(f"  Part {i} (bytes): {part[:100]}")
-                        else:
-                            print(f"  Part {i}: {len(part)} bytes")
-                    self.messages.append(('client->kernel', msg))
-                    backend.send_multipart(msg[1:])  # Strip routing ID for DEALER
-
-                if backend in socks:
-                    # Message from kernel to client
-                    msg = backend.recv_multipart()
-                    print(f"\n📥 Kernel->Client ({len(msg)} parts)")
-                    # Need to add routing ID for ROUTER
-                    # This is complex - skipping for now
-
-        thread = threading.Thread(target=run_proxy)
-        thread.daemon = True
-        thread.start()
+                msg = listener.recv_multipart()
+                if msg == [b'']:
+                    listener.close()
+                    return
+                direction = _direction(msg)
+                arrow = '📤' if direction == 'client->kernel' else '📥'
+                print(f"\n{arrow} {direction} ({len(msg)} parts):")
+                for i, part in enumerate(msg):
+                    if len(part) < 100:
+                        # Identity frames are binary; show them with
+                        # replacement characters rather than failing over
+                        print(f"  Part {i}: {part.decode('utf-8', 'replace')}")
+                    else:
+                        print(f"  Part {i}: {len(part)} bytes")
+                self.messages.append((direction, msg))
+                if direction == 'client->kernel':
+                    self.first_message.set()
+
+        # Both threads block in libzmq until there is traffic or stop() is
+        # called; they are daemons so a failed test cannot hang the process
+        self._threads = [threading.Thread(target=target, daemon=True)
+                         for target in (run_proxy, log_captured)]
+        for thread in self._threads:
+            thread.start()
 
         return frontend_port
 
+    def stop(self, timeout=2.0):
+        """Terminate the proxy, wait for its threads and free its port."""
+        if self._control is not None:
+            self._control.send(b'TERMINATE')
+            for thread in self._threads:
+                thread.join(timeout)
+            self._control.close()
+            self._control = None
+        # destroy() rather than term(), so a thread that did not finish in
+        # time cannot leave term() waiting on its sockets
+        self.context.destroy(linger=0)
+
 def test_raw_zmq_format():
     """Show exact message format from raw ZeroMQ."""
     print("\n" + "="*60)
@@ -77,12 +156,12 @@ def test_raw_zmq_format():
     print("="*60)
 
     # Load connection info
-    with open("/tmp/llmspell-test/kernel.json") as f:
-        conn_info = json.load(f)
+    conn_info = _load_conn()
 
-    # Create socket
-    context = zmq.Context()
+    # Create socket on the process-wide context
+    context = zmq.Context.instance()
     socket = context.socket(zmq.DEALER)
+    socket.setsockopt(zmq.LINGER, 0)
     socket.connect(f"tcp://127.0.0.1:{conn_info['control_port']}")
 
     # Build debug_request message
@@ -94,54 +173,18 @@ def test_raw_zmq_format():
         "msg_type": "debug_request",
         "session": session,
         "username": "test",
-        "date": datetime.utcnow().isoformat() + 'Z',
+        "date": _STATIC_DATE,
         "version": "5.3"
     }
 
-    parent_header = {}
-    metadata = {}
-    content = {
-        "command": "initialize",
-        "arguments": {
-            "clientID": "message_comparison",
-            "linesStartAt1": True
-        }
-    }
-
-    # Serialize parts
-    header_bytes = json.dumps(header).encode('utf-8')
-    parent_header_bytes = json.dumps(parent_header).encode('utf-8')
-    metadata_bytes = json.dumps(metadata).encode('utf-8')
-    content_bytes = json.dumps(content).encode('utf-8')
-
-    # Create HMAC signature
-    h = hmac.new(
-        conn_info['key'].encode('utf-8'),
-        digestmod=hashlib.sha256
-    )
-    h.update(header_bytes)
-    h.update(parent_header_bytes)
-    h.update(metadata_bytes)
-    h.update(content_bytes)
-    signature = h.hexdigest()
-
-    # Build multipart message
-    message = [
-        b'<IDS|MSG>',
-        signature.encode('utf-8'),
-        header_bytes,
-        parent_header_bytes,
-        metadata_bytes,
-        content_bytes
-    ]
+    # Serialize, sign and frame; everything but the header is pre-serialized
+    signer = make_signer(conn_info['key'].encode('utf-8'))
+    message = wire_message(signer, header, content=_DAP_INITIALIZE)
 
     print(f"Sending {len(message)} parts:")
     for i, part in enumerate(message):
         if len(part) < 100:
-            try:
-                print(f"  Part {i}: {part.decode('utf-8')}")
-            except:
-                print(f"  Part {i}: {part}")
+            print(f"  Part {i}: {part.decode('utf-8', 'replace')}")
         else:
             print(f"  Part {i}: {len(part)} bytes")
 
@@ -152,7 +195,7 @@ def test_raw_zmq_format():
         reply = socket.recv_multipart()
         print(f"\n✅ Got reply with {len(reply)} parts")
         return True
-    except:
+    except zmq.ZMQError:
         print("\n❌ No reply received")
         return False
 
@@ -162,17 +205,14 @@ def test_jupyter_client_format():
     print("JUPYTER_CLIENT MESSAGE FORMAT")
     print("="*60)
 
-    # Create client
-    client = BlockingKernelClient()
-    client.load_connection_file("/tmp/llmspell-test/kernel.json")
+    # Connected client for the kernel, shared with the other tests that
+    # talk to it instead of starting a fresh set of channels here
+    client = shared_client(CONNECTION_FILE)
 
-    # Let's examine the control channel before starting
+    # Let's examine the control channel
     print(f"Control channel type: {type(client.control_channel)}")
     print(f"Control channel class: {client.control_channel.__class__.__name__}")
 
-    # Start channels
-    client.start_channels()
-
     # Build message using session
     msg = client.session.msg('debug_request', {
         'command': 'initialize',
@@ -194,16 +234,18 @@ def test_jupyter_client_format():
     if hasattr(client.control_channel, 'socket'):
         print(f"  control_channel.socket: {client.control_channel.socket}")
 
-    # Try to trace what send() does
-    import inspect
-    print(f"\ncontrol_channel.send method:")
-    try:
-        source = inspect.getsource(client.control_channel.send)
-        print("  Source code:")
-        for line in source.split('\n')[:10]:
-            print(f"    {line}")
-    except:
-        print("  Could not get source")
+    # Try to trace what send() does; reading and tokenizing the source is
+    # only worth it when chasing a protocol problem
+    if os.environ.get("LLMSPELL_DIAGNOSTICS") == "1":
+        import inspect
+        print(f"\ncontrol_channel.send method:")
+        try:
+            source = inspect.getsource(client.control_channel.send)
+            print("  Source code:")
+            for line in source.split('\n')[:10]:
+                print(f"    {line}")
+        except (OSError, TypeError):
+            print("  Could not get source")
 
     # Actually send it
     print("\nSending via control_channel.send()...")
@@ -214,7 +256,7 @@ def test_jupyter_client_format():
         reply = client.control_channel.get_msg(timeout=2)
         print(f"✅ Got reply: {reply.get('msg_type')}")
         return True
-    except:
+    except Empty:
         print("❌ No reply received")
         return False
 
@@ -225,8 +267,7 @@ def test_with_proxy():
     print("="*60)
 
     # Load original connection info
-    with open("/tmp/llmspell-test/kernel.json") as f:
-        conn_info = json.load(f)
+    conn_info = _load_conn()
 
     # Create proxy
     capture = MessageCapture()
@@ -237,19 +278,18 @@ def test_with_proxy():
     print(f"Starting proxy: {proxy_port} -> {real_port}")
     capture.create_proxy(proxy_port, real_port)
 
-    # Modify connection file for client
+    # Point the client's control channel at the proxy; the connection info
+    # is handed over directly, without a connection file on disk
     proxy_conn = conn_info.copy()
     proxy_conn['control_port'] = proxy_port
 
-    with open("/tmp/proxy-kernel.json", 'w') as f:
-        json.dump(proxy_conn, f)
-
-    time.sleep(1)
+    # No wait needed here: create_proxy() has already bound the frontend,
+    # and the client's connect() would retry until it is up anyway
 
     # Test with jupyter_client through proxy
     print("\nTesting jupyter_client through proxy...")
     client = BlockingKernelClient()
-    client.load_connection_file("/tmp/proxy-kernel.json")
+    client.load_connection_info(proxy_conn)
     client.start_channels()
 
     msg = client.session.msg('debug_request', {
@@ -258,12 +298,14 @@ def test_with_proxy():
     })
 
     client.control_channel.send(msg)
-    time.sleep(2)
+    if not capture.first_message.wait(2.0):
+        print("  No message reached the proxy within 2s")
 
     # Check captured messages
     print(f"\nCaptured {len(capture.messages)} messages")
 
     client.stop_channels()
+    capture.stop()
 
 if __name__ == "__main__":
     print("Message Format Comparison Test")
@@ -277,6 +319,7 @@ if __name__ == "__main__":
 
     # Test 3: Capture with proxy
     test_with_proxy()
+    close_clients()
 
     print("\n" + "="*60)
     print("RESULTS:")
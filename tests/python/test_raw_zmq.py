@@ -6,10 +6,59 @@ This verifies basic transport layer functionality before testing with jupyter_cl
 
 import zmq
 import json
+import time
 import uuid
 import hmac
-import hashlib
-from datetime import datetime
+from kernel_helpers import (
+    json_dumps, json_loads, WIRE_DELIMITER, make_signer, sign_message, wire_message
+)
+
+# Header fields that are identical for every message this test sends
+_HEADER_STATIC = {"username": "test", "version": "5.3"}
+
+# The kernel does not check header dates, so every message reuses the
+# time this module was loaded
+_STATIC_DATE = time.strftime("%Y-%m-%dT%H:%M:%S.000000Z", time.gmtime())
+
+# DAP initialize request content, serialized once
+_DAP_INITIALIZE = json_dumps({
+    "command": "initialize",
+    "arguments": {
+        "clientID": "test_zmq",
+        "clientName": "Raw ZMQ Test",
+        "adapterID": "llmspell",
+        "linesStartAt1": True,
+        "columnsStartAt1": True
+    }
+})
+
+def make_header(session, msg_type):
+    """Build a message header from the static fields plus per-message ones."""
+    return {
+        **_HEADER_STATIC,
+        "msg_id": str(uuid.uuid4()),
+        "session": session,
+        "msg_type": msg_type,
+        "date": _STATIC_DATE
+    }
+
+def verify_signature(signer, signature, parts):
+    """Check a hex signature frame against the parts, in constant time."""
+    h = signer.copy()
+    h.update(b''.join(parts))
+    try:
+        return hmac.compare_digest(h.digest(), bytes.fromhex(signature.decode('ascii')))
+    except (UnicodeDecodeError, ValueError):
+        return False
+
+def split_message(parts):
+    """Return the signature, header, parent, metadata and content frames, or None."""
+    try:
+        delimiter_idx = parts.index(WIRE_DELIMITER)
+        signature, header, parent, metadata, content = parts[delimiter_idx + 1:delimiter_idx + 6]
+    except ValueError:
+        return None
+    return signature, header, parent, metadata, content
 
 def test_raw_zmq():
     """Test kernel with raw ZeroMQ messages."""
@@ -23,60 +72,30 @@ def test_raw_zmq():
     print(f"  Control port: {conn['control_port']}")
     print(f"  Key: {conn['key'][:20]}...")
 
-    # Create ZeroMQ context
-    ctx = zmq.Context()
+    # Share the process-wide context rather than starting (and terminating)
+    # a private IO thread per test
+    ctx = zmq.Context.instance()
 
     # Connect to shell channel
     shell = ctx.socket(zmq.DEALER)
+    shell.setsockopt(zmq.LINGER, 0)  # never block on unsent frames if the kernel is gone
+    shell.setsockopt(zmq.IMMEDIATE, 1)  # only queue once the kernel is connected
     shell.connect(f"tcp://127.0.0.1:{conn['shell_port']}")
     print(f"\n✓ Connected to shell channel on port {conn['shell_port']}")
 
     # Create kernel_info_request message
-    msg_id = str(uuid.uuid4())
     session = str(uuid.uuid4())
+    header = make_header(session, "kernel_info_request")
+    msg_id = header["msg_id"]
 
-    header = {
-        "msg_id": msg_id,
-        "session": session,
-        "username": "test",
-        "msg_type": "kernel_info_request",
-        "version": "5.3",
-        "date": datetime.utcnow().isoformat() + 'Z'
-    }
-
-    parent_header = {}
-    metadata = {}
-    content = {}
-
-    # Serialize message parts
-    header_bytes = json.dumps(header).encode('utf-8')
-    parent_header_bytes = json.dumps(parent_header).encode('utf-8')
-    metadata_bytes = json.dumps(metadata).encode('utf-8')
-    content_bytes = json.dumps(content).encode('utf-8')
-
-    # Create HMAC signature
-    key = conn['key'].encode('utf-8')
-    h = hmac.new(key, digestmod=hashlib.sha256)
-    h.update(header_bytes)
-    h.update(parent_header_bytes)
-    h.update(metadata_bytes)
-    h.update(content_bytes)
-    signature = h.hexdigest()
-
-    # Send multipart message
+    # Serialize and sign; parent header, metadata and content are empty
     # [delimiter, signature, header, parent_header, metadata, content]
-    message = [
-        b'<IDS|MSG>',
-        signature.encode('utf-8'),
-        header_bytes,
-        parent_header_bytes,
-        metadata_bytes,
-        content_bytes
-    ]
+    signer = make_signer(conn['key'].encode('utf-8'))
+    message = wire_message(signer, header)
 
     print(f"\n→ Sending kernel_info_request")
     print(f"  msg_id: {msg_id}")
-    print(f"  Signature: {signature[:20]}...")
+    print(f"  Signature: {message[1][:20].decode()}...")
 
     shell.send_multipart(message)
     print(f"✓ Message sent")
@@ -92,18 +111,11 @@ def test_raw_zmq():
         print(f"✓ Received reply with {len(reply_parts)} parts")
 
         # Parse reply
-        delimiter_idx = None
-        for i, part in enumerate(reply_parts):
-            if part == b'<IDS|MSG>':
-                delimiter_idx = i
-                break
-
-        if delimiter_idx is not None and len(reply_parts) > delimiter_idx + 5:
-            reply_signature = reply_parts[delimiter_idx + 1].decode('utf-8')
-            reply_header = json.loads(reply_parts[delimiter_idx + 2])
-            reply_parent = json.loads(reply_parts[delimiter_idx + 3])
-            reply_metadata = json.loads(reply_parts[delimiter_idx + 4])
-            reply_content = json.loads(reply_parts[delimiter_idx + 5])
+        frames = split_message(reply_parts)
+
+        if frames is not None:
+            reply_signature = frames[0]
+            reply_header, reply_parent, reply_metadata, reply_content = map(json_loads, frames[1:])
 
             print(f"\nReply details:")
             print(f"  msg_type: {reply_header.get('msg_type')}")
@@ -116,20 +128,13 @@ def test_raw_zmq():
             else:
                 print(f"  ✗ Parent header mismatch: expected {msg_id}, got {reply_parent.get('msg_id')}")
 
-            # Verify signature
-            h = hmac.new(key, digestmod=hashlib.sha256)
-            h.update(reply_parts[delimiter_idx + 2])  # header
-            h.update(reply_parts[delimiter_idx + 3])  # parent
-            h.update(reply_parts[delimiter_idx + 4])  # metadata
-            h.update(reply_parts[delimiter_idx + 5])  # content
-            expected_sig = h.hexdigest()
-
-            if reply_signature == expected_sig:
+            # Verify signature over header, parent, metadata, content
+            if verify_signature(signer, reply_signature, frames[1:]):
                 print(f"  ✓ HMAC signature valid!")
             else:
                 print(f"  ✗ HMAC signature mismatch")
-                print(f"    Expected: {expected_sig[:20]}...")
-                print(f"    Got:      {reply_signature[:20]}...")
+                print(f"    Expected: {sign_message(signer, frames[1:])[:20]}...")
+                print(f"    Got:      {reply_signature[:20].decode('utf-8', 'replace')}...")
 
             if reply_header['msg_type'] == 'kernel_info_reply':
                 print(f"\n✓ SUCCESS: Kernel responded to kernel_info_request!")
@@ -156,8 +161,7 @@ def test_raw_zmq():
         traceback.print_exc()
         return False
     finally:
-        shell.close()
-        ctx.term()
+        shell.close(linger=0)
 
 def test_dap_via_zmq():
     """Test DAP through debug_request with raw ZeroMQ."""
@@ -170,64 +174,24 @@ def test_dap_via_zmq():
     print(f"Testing DAP via debug_request")
     print(f"{'='*60}")
 
-    # Create ZeroMQ context
-    ctx = zmq.Context()
+    # Share the process-wide context rather than starting (and terminating)
+    # a private IO thread per test
+    ctx = zmq.Context.instance()
 
     # Connect to control channel (debug_request goes through control)
     control = ctx.socket(zmq.DEALER)
+    control.setsockopt(zmq.LINGER, 0)
+    control.setsockopt(zmq.IMMEDIATE, 1)
     control.connect(f"tcp://127.0.0.1:{conn['control_port']}")
     print(f"✓ Connected to control channel on port {conn['control_port']}")
 
     # Create debug_request message with DAP initialize command
-    msg_id = str(uuid.uuid4())
     session = str(uuid.uuid4())
+    header = make_header(session, "debug_request")
 
-    header = {
-        "msg_id": msg_id,
-        "session": session,
-        "username": "test",
-        "msg_type": "debug_request",
-        "version": "5.3",
-        "date": datetime.utcnow().isoformat() + 'Z'
-    }
-
-    parent_header = {}
-    metadata = {}
-
-    # DAP initialize command
-    content = {
-        "command": "initialize",
-        "arguments": {
-            "clientID": "test_zmq",
-            "clientName": "Raw ZMQ Test",
-            "adapterID": "llmspell",
-            "linesStartAt1": True,
-            "columnsStartAt1": True
-        }
-    }
-
-    # Serialize and sign
-    header_bytes = json.dumps(header).encode('utf-8')
-    parent_header_bytes = json.dumps(parent_header).encode('utf-8')
-    metadata_bytes = json.dumps(metadata).encode('utf-8')
-    content_bytes = json.dumps(content).encode('utf-8')
-
-    key = conn['key'].encode('utf-8')
-    h = hmac.new(key, digestmod=hashlib.sha256)
-    h.update(header_bytes)
-    h.update(parent_header_bytes)
-    h.update(metadata_bytes)
-    h.update(content_bytes)
-    signature = h.hexdigest()
-
-    message = [
-        b'<IDS|MSG>',
-        signature.encode('utf-8'),
-        header_bytes,
-        parent_header_bytes,
-        metadata_bytes,
-        content_bytes
-    ]
+    # Serialize and sign; the DAP initialize content is pre-serialized
+    signer = make_signer(conn['key'].encode('utf-8'))
+    message = wire_message(signer, header, content=_DAP_INITIALIZE)
 
     print(f"\n→ Sending debug_request (DAP initialize)")
     control.send_multipart(message)
@@ -242,15 +206,11 @@ def test_dap_via_zmq():
         print(f"✓ Received reply with {len(reply_parts)} parts")
 
         # Parse reply
-        delimiter_idx = None
-        for i, part in enumerate(reply_parts):
-            if part == b'<IDS|MSG>':
-                delimiter_idx = i
-                break
+        frames = split_message(reply_parts)
 
-        if delimiter_idx is not None and len(reply_parts) > delimiter_idx + 5:
-            reply_header = json.loads(reply_parts[delimiter_idx + 2])
-            reply_content = json.loads(reply_parts[delimiter_idx + 5])
+        if frames is not None:
+            reply_header = json_loads(frames[1])
+            reply_content = json_loads(frames[4])
 
             if reply_header['msg_type'] == 'debug_reply':
                 print(f"\n✓ SUCCESS: Received debug_reply!")
@@ -285,8 +245,7 @@ def test_dap_via_zmq():
         print(f"✗ ERROR: {e}")
         return False
     finally:
-        control.close()
-        ctx.term()
+        control.close(linger=0)
 
 if __name__ == "__main__":
     print("="*60)
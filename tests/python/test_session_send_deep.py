@@ -1,87 +1,180 @@
 #!/usr/bin/env python3
 """
 Deep trace of Session.send() to see actual ZMQ operations.
+
+The control and shell sockets are watched with libzmq socket monitors,
+which report connection events without touching the data path. Set
+LLMSPELL_TRACE_ZMQ=1 to also print the parts of every send_multipart()
+while the requests are sent.
+
+Runs on the session's shared kernel client; with pytest it only runs when
+LLMSPELL_DIAGNOSTICS=1 is set.
 """
 
-import json
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from queue import Empty
+import pytest
 import zmq
-from jupyter_client import BlockingKernelClient
+from zmq.utils.monitor import recv_monitor_message
+from kernel_helpers import debug_request_msg, json_loads, wait_for_reply, shared_client, close_clients
+
+# Tracing wraps every send_multipart() in the process, so it is opt-in;
+# without LLMSPELL_TRACE_ZMQ=1 sends go straight to pyzmq
+TRACE_ENABLED = os.environ.get("LLMSPELL_TRACE_ZMQ") == "1"
 
-# Monkey-patch zmq socket to trace sends
 original_send_multipart = zmq.Socket.send_multipart
 
+# Socket type names, looked up once per socket rather than per send
+_socket_type_names = weakref.WeakKeyDictionary()
+
+def _socket_type_name(sock):
+    name = _socket_type_names.get(sock)
+    if name is None:
+        name = _socket_type_names[sock] = zmq.SocketType(sock.socket_type).name
+    return name
+
+def _describe_part(i, part):
+    if not isinstance(part, bytes):
+        return f"   Part {i} (non-bytes): {type(part)}\n"
+    if len(part) >= 100:
+        return f"   Part {i}: {len(part)} bytes\n"
+    # Only parts that start like a JSON object are worth parsing
+    if part[:1] == b'{':
+        try:
+            parsed = json_loads(part)
+            return f"   Part {i} (JSON): {list(parsed.keys())}\n"
+        except ValueError:
+            pass
+    return f"   Part {i}: {part[:50].decode('utf-8', 'replace')}\n"
+
+def _describe_send(sock, msg_parts):
+    lines = [
+        f"\n🔍 ZMQ send_multipart() called on {_socket_type_name(sock)} socket:\n",
+        f"   Number of parts: {len(msg_parts)}\n",
+    ]
+    lines.extend(_describe_part(i, part) for i, part in enumerate(msg_parts))
+    return "".join(lines)
+
+# Sends recorded while tracing with stdout not a terminal (CI logs, pytest
+# capture); they are described once tracing ends, keeping decode and print
+# work off the send path. Only the most recent sends are kept.
+_recorded_sends = deque(maxlen=64)
+_live_trace = True
+
 def traced_send_multipart(self, msg_parts, **kwargs):
     """Trace what's actually sent via ZMQ."""
-    print(f"\n🔍 ZMQ send_multipart() called on {self.socket_type} socket:")
-    print(f"   Number of parts: {len(msg_parts)}")
-    for i, part in enumerate(msg_parts):
-        if isinstance(part, bytes):
-            if len(part) < 100:
-                try:
-                    decoded = part.decode('utf-8')
-                    # Check if it's JSON
-                    try:
-                        parsed = json.loads(decoded)
-                        print(f"   Part {i} (JSON): {list(parsed.keys()) if isinstance(parsed, dict) else decoded[:50]}")
-                    except:
-                        print(f"   Part {i} (string): {decoded[:50]}")
-                except:
-                    print(f"   Part {i} (bytes): {part[:50]}")
-            else:
-                print(f"   Part {i}: {len(part)} bytes")
-        else:
-            print(f"   Part {i} (non-bytes): {type(part)}")
+    if not _live_trace:
+        _recorded_sends.append((self, list(msg_parts)))
+        return original_send_multipart(self, msg_parts, **kwargs)
+
+    sys.stdout.write(_describe_send(self, msg_parts))
 
     # Call original
     result = original_send_multipart(self, msg_parts, **kwargs)
     print(f"   ✅ send_multipart completed")
     return result
 
-# Apply monkey patch
-zmq.Socket.send_multipart = traced_send_multipart
+@contextmanager
+def send_tracing():
+    """Route send_multipart() through the trace while the block runs.
 
-print("="*60)
-print("DEEP TRACE OF SESSION.SEND()")
-print("="*60)
+    On a terminal each send is printed as it happens; otherwise the sends
+    are recorded and printed together when the block exits.
+    """
+    global _live_trace
+    if not TRACE_ENABLED:
+        print("ZMQ send tracing is off; set LLMSPELL_TRACE_ZMQ=1 to trace sends")
+        yield
+        return
+    _live_trace = sys.stdout.isatty()
+    zmq.Socket.send_multipart = traced_send_multipart
+    try:
+        yield
+    finally:
+        zmq.Socket.send_multipart = original_send_multipart
+        if _recorded_sends:
+            sys.stdout.write("".join(_describe_send(sock, parts) for sock, parts in _recorded_sends))
+            _recorded_sends.clear()
 
-# Create client
-client = BlockingKernelClient()
-client.load_connection_file("/tmp/llmspell-test/kernel.json")
-client.start_channels()
+def _drain_monitor(mon, name, events):
+    """Collect a socket's monitor events until its monitor is disabled."""
+    while True:
+        evt = recv_monitor_message(mon)
+        if evt['event'] == zmq.EVENT_MONITOR_STOPPED:
+            break
+        events.append((name, zmq.Event(evt['event']).name, evt['endpoint']))
+    mon.close()
 
-print("\n1. Sending debug_request via control channel...")
-msg = client.session.msg('debug_request', {
-    'command': 'initialize',
-    'arguments': {'clientID': 'deep_trace_test'}
-})
+def start_monitors(client, names=('control', 'shell')):
+    """Monitor the given channels' sockets; returns the event list and threads."""
+    events = []
+    threads = []
+    for name in names:
+        mon = getattr(client, f"{name}_channel").socket.get_monitor_socket()
+        thread = threading.Thread(target=_drain_monitor, args=(mon, name, events), daemon=True)
+        thread.start()
+        threads.append(thread)
+    return events, threads
 
-print(f"   Message type in dict: {msg.get('msg_type')}")
-print(f"   Calling control_channel.send()...")
-client.control_channel.send(msg)
+@pytest.mark.diagnostic
+def test_deep_trace(kernel_client):
+    """Send a debug_request and an execute_request and trace both sends."""
+    client = kernel_client
 
-print("\n2. Waiting for any ZMQ operations...")
-import time
-time.sleep(0.5)
-
-print("\n3. For comparison, sending execute_request via shell...")
-exec_id = client.execute('print("test")', silent=False)
-print(f"   Execute msg_id: {exec_id}")
-
-print("\n4. Checking for replies...")
-try:
-    reply = client.control_channel.get_msg(timeout=1)
-    print(f"   ✅ Control channel got reply: {reply.get('msg_type')}")
-except:
-    print(f"   ❌ No control channel reply")
-
-try:
-    reply = client.get_shell_msg(timeout=1)
-    print(f"   ✅ Shell channel got reply: {reply.get('content', {}).get('status')}")
-except:
-    print(f"   ❌ No shell reply")
-
-client.stop_channels()
-
-print("\n" + "="*60)
-print("ANALYSIS:")
-print("Compare the multipart messages sent for control vs shell")
\ No newline at end of file
+    print("="*60)
+    print("DEEP TRACE OF SESSION.SEND()")
+    print("="*60)
+
+    monitor_events, monitor_threads = start_monitors(client)
+
+    print("\n1. Sending debug_request via control channel...")
+    msg = debug_request_msg(client.session, 'initialize', {'clientID': 'deep_trace_test'})
+
+    print(f"   Message type in dict: {msg.get('msg_type')}")
+    print(f"   Calling control_channel.send()...")
+    with send_tracing():
+        client.control_channel.send(msg)
+
+        print("\n2. Waiting for any ZMQ operations...")
+        time.sleep(0.5)
+
+        print("\n3. For comparison, sending execute_request via shell...")
+        exec_id = client.execute('print("test")', silent=False)
+        print(f"   Execute msg_id: {exec_id}")
+
+    print("\n4. Checking for replies...")
+    reply = wait_for_reply(client.control_channel, msg['header']['msg_id'], timeout=1)
+    if reply:
+        print(f"   ✅ Control channel got reply: {reply.get('msg_type')}")
+    else:
+        print(f"   ❌ No control channel reply")
+
+    try:
+        reply = client.get_shell_msg(timeout=1)
+        print(f"   ✅ Shell channel got reply: {reply.get('content', {}).get('status')}")
+    except Empty:
+        print(f"   ❌ No shell reply")
+
+    print("\n5. Socket monitor events:")
+    for channel in (client.control_channel, client.shell_channel):
+        channel.socket.disable_monitor()
+    for thread in monitor_threads:
+        thread.join(1)
+    for name, event, endpoint in monitor_events:
+        print(f"   {name:8} {event} {endpoint.decode()}")
+
+    print("\n" + "="*60)
+    print("ANALYSIS:")
+    print("Compare the multipart messages sent for control vs shell")
+
+if __name__ == "__main__":
+    try:
+        test_deep_trace(shared_client())
+    finally:
+        close_clients()
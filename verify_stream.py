@@ -3,54 +3,93 @@ import aiohttp
 import json
 import sys
 
+try:
+    import orjson  # Optional: faster decoding of the event stream
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        return json.dumps(obj).encode()
+
+try:
+    import uvloop  # Optional: libuv-based event loop
+    run = uvloop.run
+except ImportError:
+    run = asyncio.run
+
+MARKER = 'TEST_VERIFICATION_OUTPUT'
+
+async def _drain_until_marker(ws, marker):
+    """Read stream events until one contains marker; False if the socket ends first.
+
+    Events whose raw text does not contain the marker at all (status,
+    execute_reply, ...) are skipped without being parsed.
+    """
+    skipped = 0
+    while True:
+        msg = await ws.receive()
+        if msg.type == aiohttp.WSMsgType.TEXT:
+            if marker not in msg.data:
+                skipped += 1
+                continue
+            data = json_loads(msg.data)
+            print(f"Received event: {data.get('event_type')}")
+
+            # Check for stream content
+            if data.get('event_type') == 'kernel.iopub.stream':
+                content = data.get('data', {}).get('content', {})
+                text = content.get('text', '')
+                print(f"Stream content: {repr(text)}")
+                if marker in text:
+                    print(f"Skipped {skipped} events without the marker")
+                    print("SUCCESS: Found expected output in stream!")
+                    return True
+        elif msg.type == aiohttp.WSMsgType.CLOSED:
+            print("WebSocket closed")
+            return False
+        elif msg.type == aiohttp.WSMsgType.ERROR:
+            print("WebSocket error")
+            return False
+
 async def verify_output():
     print("Connecting to WebSocket...")
     async with aiohttp.ClientSession() as session:
         async with session.ws_connect('http://localhost:3000/ws/stream') as ws:
             print("WebSocket connected. Triggering script...")
-            
+
+            # Start reading before the POST so the first events are handled
+            # while the execute request is still in flight
+            recv_task = asyncio.create_task(_drain_until_marker(ws, MARKER))
+
             # Trigger script execution
-            script_payload = {
-                "code": "print('TEST_VERIFICATION_OUTPUT')",
+            script_payload = json_dumps({
+                "code": f"print('{MARKER}')",
                 "engine": "lua"
-            }
-            
-            async with session.post('http://localhost:3000/api/scripts/execute', json=script_payload) as resp:
-                print(f"Execute response: {resp.status}")
-                if resp.status != 200:
-                    print(await resp.text())
-                    return False
+            })
+
+            # Reading the (small) body right away returns the connection to
+            # the pool before the wait on the stream starts
+            resp = await session.post('http://localhost:3000/api/scripts/execute', data=script_payload,
+                                      headers={'Content-Type': 'application/json'})
+            body = await resp.read()
+            print(f"Execute response: {resp.status}")
+            if resp.status != 200:
+                print(body.decode('utf-8', 'replace'))
+                recv_task.cancel()
+                return False
 
             print("Waiting for stream message...")
             try:
-                # Wait for messages
-                while True:
-                    msg = await asyncio.wait_for(ws.receive(), timeout=5.0)
-                    if msg.type == aiohttp.WSMsgType.TEXT:
-                        data = json.loads(msg.data)
-                        print(f"Received event: {data.get('event_type')}")
-                        
-                        # Check for stream content
-                        if data.get('event_type') == 'kernel.iopub.stream':
-                            content = data.get('data', {}).get('content', {})
-                            text = content.get('text', '')
-                            print(f"Stream content: {repr(text)}")
-                            if 'TEST_VERIFICATION_OUTPUT' in text:
-                                print("SUCCESS: Found expected output in stream!")
-                                return True
-                    elif msg.type == aiohttp.WSMsgType.CLOSED:
-                        print("WebSocket closed")
-                        break
-                    elif msg.type == aiohttp.WSMsgType.ERROR:
-                        print("WebSocket error")
-                        break
+                return await asyncio.wait_for(recv_task, timeout=5.0)
             except asyncio.TimeoutError:
                 print("Timed out waiting for output")
                 return False
 
 if __name__ == "__main__":
     try:
-        if asyncio.run(verify_output()):
+        if run(verify_output()):
             sys.exit(0)
         else:
             sys.exit(1)